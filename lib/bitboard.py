@@ -0,0 +1,198 @@
+"""
+Implement a game board that additionally stores the stones as bitmasks
+
+The stones of each color are kept in one (arbitrary-precision) integer.
+Bit ``y * (width + 1) + x`` is set if the position ``(y,x)`` holds a stone
+of that color. Every row is followed by one padding bit that is never set
+such that shifting a mask along a row or a diagonal does not wrap around
+into the neighboring row.
+
+"""
+
+import functools
+import numpy as np
+from .board import Board, InvalidMoveError, black, white
+
+class BitBoard(Board):
+    """
+    Gomoku game board that keeps one bitmask per color in addition to
+    the array ``board``. It is a drop-in replacement for ``Board``; the
+    queries ``winner``, ``is_empty`` and ``winning_moves`` are answered by
+    AND-ing shifted bitmasks.
+    Stones placed by ``self[y,x]`` update everything a ``Board`` keeps
+    (the array, the line counts, the hash, ...) plus the bitmasks and are
+    no faster than on a ``Board``. For fast self-play use ``play`` and
+    ``unplay`` instead, which update the bitmasks, ``in_turn`` and
+    ``moves_left`` only; until all of these moves are taken back the
+    other attributes still describe the position before the first
+    ``play`` and only the bitmask queries (``is_empty``, ``empty_mask``
+    and ``winning_moves``) see the played stones. Placing or taking back
+    stones by ``self[y,x]`` and ``undo`` and the queries of ``Board`` that
+    read the array, the line counts or the log (see ``board_queries``)
+    raise ``InvalidMoveError`` in the meantime.
+
+    """
+    # the methods of ``Board`` that do not see the stones placed by ``play``
+    board_queries = ('__getitem__', 'winner', 'to_bytes', 'get_lines', 'get_line_counts', 'get_line_views',
+                     '_get_line', 'random_empty', 'random_candidate', 'empty_positions', 'candidate_cells',
+                     'candidate_moves')
+
+    def __init__(self, height, width, win_length=5):
+        self.stride = int(width) + 1
+        # shifts that move a bit one position along a row, column,
+        # diagonal lowleft to upright and diagonal upleft to lowright
+        self.shifts = (1, self.stride, self.stride - 1, self.stride + 1)
+        self.full_mask = 0
+        for y in range(int(height)):
+            self.full_mask |= ((1 << int(width)) - 1) << (y * self.stride)
+
+        super(BitBoard, self).__init__(height, width, win_length)
+
+    def reset(self):
+        self.masks = {black: 0, white: 0}
+        # the bits of the stones placed by ``play``
+        self.played = []
+        super(BitBoard, self).reset()
+
+    def _bit(self, key):
+        y, x = key
+        return 1 << ((int(y) % self.height) * self.stride + int(x) % self.width)
+
+    def _position(self, bit_index):
+        return divmod(bit_index, self.stride)
+
+    def _check_not_played(self):
+        "Raise ``InvalidMoveError`` unless all stones placed by ``play`` are taken back"
+        if self.played:
+            raise InvalidMoveError('%i stones placed by play are not taken back' % len(self.played))
+
+    def __setitem__(self, key, value):
+        self._check_not_played()
+        super(BitBoard, self).__setitem__(key, value)
+        self.masks[value] |= self._bit(key)
+
+    def _load_array(self, array, in_turn):
+        super(BitBoard, self)._load_array(array, in_turn)
+        for color in (black, white):
+            for y, x in np.argwhere(self.board == color).tolist():
+                self.masks[color] |= self._bit((y,x))
+
+    def undo(self):
+        self._check_not_played()
+        key = super(BitBoard, self).undo()
+        self.masks[self.in_turn] &= ~self._bit(key)
+        return key
+
+    def play(self, y, x):
+        """
+        Place a stone of the color in turn at (`y`,`x`) on the bitmasks
+        only (see the class description) and return bool that indicates
+        if the stone wins. The caller stops playing after a win.
+
+        """
+        bit = self._bit((y,x))
+        if (self.masks[black] | self.masks[white]) & bit:
+            raise InvalidMoveError('Position %s is already taken' % ((y,x),))
+        color = self.in_turn
+        mask = self.masks[color] = self.masks[color] | bit
+        self.in_turn = -color
+        self.moves_left -= 1
+        self.played.append(bit)
+        # no earlier stone won, so any line of the win length is new
+        for shift in self.shifts:
+            if self._run_starts(mask, shift):
+                return True
+        return False
+
+    def unplay(self):
+        "Take back the last stone placed by ``play``"
+        if not self.played:
+            raise InvalidMoveError('There is no played move to take back')
+        color = -self.in_turn
+        self.masks[color] &= ~self.played.pop()
+        self.in_turn = color
+        self.moves_left += 1
+
+    def is_empty(self, y, x):
+        "Return bool that indicates if the position (`y`,`x`) is empty"
+        return not (self.masks[black] | self.masks[white]) & self._bit((y,x))
+
+    def empty_mask(self):
+        "Return the bitmask of all empty positions"
+        return self.full_mask & ~(self.masks[black] | self.masks[white])
+
+    def _run_starts(self, mask, shift):
+        """
+        Return the bitmask of the first stones of all runs of
+        ``win_length`` stones along `shift`. The length of the covered
+        runs is doubled in every step.
+
+        """
+        covered = 1
+        while 2 * covered <= self.win_length:
+            mask &= mask >> (covered * shift)
+            covered *= 2
+        if covered < self.win_length:
+            mask &= mask >> ((self.win_length - covered) * shift)
+        return mask
+
+    def _find_winning_line(self, key):
+        color = self.board[key]
+        mask = self.masks[color] | self._bit(key)
+        for shift in self.shifts:
+            starts = self._run_starts(mask, shift)
+            if not starts:
+                continue
+            if shift == self.stride - 1:
+                # the diagonals lowleft to upright are listed from the
+                # lower left as in ``get_diagonal_lowleft_to_upright``
+                first_bit = starts.bit_length() - 1
+                positions = [self._position(first_bit + i * shift) for i in range(self.win_length - 1, -1, -1)]
+            else:
+                first_bit = (starts & -starts).bit_length() - 1
+                positions = [self._position(first_bit + i * shift) for i in range(self.win_length)]
+            return color, positions
+        return None, []
+
+    def winning_moves(self, color):
+        """
+        Return the positions where a stone of `color` completes a winning
+        line (all but one position of a line taken) sorted by row and
+        column.
+
+        """
+        own = self.masks[color]
+        length = self.win_length
+        moves = 0
+        for shift in self.shifts:
+            shifted = [own >> (i * shift) for i in range(length)]
+            # ``before[i]`` (``after[i]``): starts of the lines whose first
+            # (last) ``i`` positions are taken
+            before = [-1]
+            for i in range(length - 1):
+                before.append(before[-1] & shifted[i])
+            after = [-1]
+            for i in range(length - 1, 0, -1):
+                after.append(after[-1] & shifted[i])
+            for gap in range(length):
+                moves |= (before[gap] & after[length - 1 - gap]) << (gap * shift)
+        moves &= self.empty_mask()
+
+        positions = []
+        while moves:
+            lowest_bit = moves & -moves
+            positions.append(self._position(lowest_bit.bit_length() - 1))
+            moves ^= lowest_bit
+        return positions
+
+def _check_not_played(query):
+    "Return the `query` of ``Board`` that first checks ``BitBoard._check_not_played``"
+    @functools.wraps(query)
+    def checked_query(self, *args, **kwargs):
+        self._check_not_played()
+        return query(self, *args, **kwargs)
+    return checked_query
+
+for name in BitBoard.board_queries:
+    setattr(BitBoard, name, _check_not_played(getattr(Board, name)))
+del name
@@ -0,0 +1,143 @@
+"Unit test for the bitmask game-board class"
+
+import unittest
+import numpy as np
+from .bitboard import *
+from .board import Board, InvalidMoveError, empty
+
+def winning_moves_by_scan(board, color):
+    "Reference implementation of ``BitBoard.winning_moves``"
+    positions = set()
+    length = board.win_length
+    for i in range(board.height):
+        for j in range(board.width):
+            for getter_function in (board.get_row, board.get_column, board.get_diagonal_lowleft_to_upright, board.get_diagonal_upleft_to_lowright):
+                try:
+                    line, line_positions = getter_function(i, j, length=length)
+                except IndexError:
+                    continue
+                if empty in line and line.sum() == (length - 1) * color:
+                    positions.add(line_positions[list(line).index(empty)])
+    return sorted(positions)
+
+class TestBitBoard(unittest.TestCase):
+    def test_is_empty(self):
+        board = BitBoard(5, 7)
+        board[4,6] = white
+        board[0,0] = black
+        for i in range(5):
+            for j in range(7):
+                self.assertEqual(board.is_empty(i,j), board[i,j] == empty)
+
+    def test_invalid_move(self):
+        board = BitBoard(5, 7)
+        board[2,3] = white
+        self.assertRaises(InvalidMoveError, board.__setitem__, (2,3), black)
+        self.assertEqual(board.masks[black], 0)
+
+    def test_winner_does_not_wrap(self):
+        board = BitBoard(6, 6)
+        # white stones at the end of row 0 and the beginning of row 1
+        # are adjacent in memory but must not count as a line
+        for white_move, black_move in zip([(0,3), (0,4), (0,5), (1,0)], [(5,0), (5,1), (5,2), (4,5)]):
+            board[white_move] = white
+            board[black_move] = black
+        board[1,1] = white
+        self.assertEqual(board.winner(), (None, []))
+
+    def test_random_games(self):
+        np.random.seed(23452)
+        for game in range(20):
+            self.play_random_game(5)
+
+    def test_win_length(self):
+        np.random.seed(13579)
+        for win_length in (3, 4, 6, 7):
+            for game in range(4):
+                self.play_random_game(win_length)
+
+    def play_random_game(self, win_length):
+        board = BitBoard(9, 11, win_length)
+        reference_board = Board(9, 11, win_length)
+        while board.winner()[0] is None and not board.full():
+            for color in (white, black):
+                self.assertEqual(board.winning_moves(color), winning_moves_by_scan(board, color))
+                self.assertEqual(reference_board.winning_moves(color), board.winning_moves(color))
+            while True:
+                y, x = np.random.randint(board.height), np.random.randint(board.width)
+                if board.is_empty(y, x):
+                    break
+            reference_board[y,x] = board.in_turn
+            board[y,x] = board.in_turn
+        self.assertEqual(board.winner(), reference_board.winner())
+        winner, positions = board.winner()
+        if winner is not None:
+            self.assertEqual(len(positions), win_length)
+            for position in positions:
+                self.assertEqual(board[position], winner)
+
+    def test_undo(self):
+        board = BitBoard(6, 6)
+        board[2,2] = white
+        board[3,3] = black
+        board.undo()
+        self.assertEqual(board.masks[black], 0)
+        self.assertTrue(board.is_empty(3,3))
+        board.undo()
+        self.assertEqual(board.masks[white], 0)
+
+    def test_play(self):
+        np.random.seed(86420)
+        for game in range(4):
+            board = BitBoard(9, 11)
+            reference_board = Board(9, 11)
+            array, masks = board.board.copy(), dict(board.masks)
+            while reference_board.winner()[0] is None and not reference_board.full():
+                y, x = reference_board.random_empty()
+                self.assertTrue(board.is_empty(y, x))
+                reference_board[y,x] = reference_board.in_turn
+                self.assertEqual(board.play(y, x), reference_board.winner()[0] is not None)
+                self.assertEqual(board.in_turn, reference_board.in_turn)
+                self.assertEqual(board.moves_left, reference_board.moves_left)
+                for color in (white, black):
+                    if reference_board.winner()[0] is None:
+                        self.assertEqual(board.winning_moves(color), winning_moves_by_scan(reference_board, color))
+            self.assertRaises(InvalidMoveError, board.play, *reference_board.lastmove)
+            # the array is not touched by ``play``
+            np.testing.assert_equal(board.board, array)
+            while board.played:
+                board.unplay()
+            self.assertEqual(board.masks, masks)
+            self.assertEqual(board.in_turn, white)
+            self.assertEqual(board.moves_left, 99)
+            self.assertRaises(InvalidMoveError, board.unplay)
+
+    def test_play_and_setitem(self):
+        board = BitBoard(9, 11)
+        board[4,4] = white
+        board.play(4, 5)
+        # the array, the line counts and the log do not know the played stone
+        self.assertRaises(InvalidMoveError, board.__setitem__, (4,6), white)
+        self.assertRaises(InvalidMoveError, board.undo)
+        self.assertRaises(InvalidMoveError, board.__getitem__, (4,5))
+        self.assertRaises(InvalidMoveError, board.winner)
+        self.assertRaises(InvalidMoveError, board.get_line_counts)
+        self.assertRaises(InvalidMoveError, board.get_row, 4, 2)
+        self.assertRaises(InvalidMoveError, board.random_empty)
+        self.assertRaises(InvalidMoveError, board.to_bytes)
+        # the bitmask queries see it
+        self.assertFalse(board.is_empty(4, 5))
+        self.assertEqual(board.masks[white], board._bit((4,4)))
+        board.unplay()
+        board[4,6] = black
+        self.assertEqual(board.log, [(4,4), (4,6)])
+        self.assertEqual(board.undo(), (4,6))
+        self.assertEqual(board.winner(), (None, []))
+
+    def test_from_bytes(self):
+        board = BitBoard(6, 7)
+        for key in [(1,1), (0,0), (1,2), (0,1), (1,3), (0,2), (1,4)]:
+            board[key] = board.in_turn
+        new_board = BitBoard.from_bytes(board.to_bytes())
+        self.assertEqual(new_board.masks, board.masks)
+        self.assertEqual(new_board.winning_moves(white), [(1,0), (1,5)])
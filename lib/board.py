@@ -5,7 +5,10 @@ This module defines the stone colors `empty`, `black` and `white`
 
 """
 
+from multiprocessing import cpu_count
+from multiprocessing.pool import ThreadPool
 import numpy as np
+import struct
 
 # the colors
 empty =  0
@@ -15,12 +18,370 @@ white = -1
 class InvalidMoveError(Exception):
     pass
 
+# the directions (dy, dx) of the lines as used in the line tables; in the
+# same order as the getter functions ``get_column``, ``get_row``,
+# ``get_diagonal_upleft_to_lowright`` and ``get_diagonal_lowleft_to_upright``
+directions = ((1, 0), (0, 1), (1, 1), (-1, 1))
+
+# Large boards (at least ``parallel_cells`` positions) are scanned in tiles
+# of ``tile_rows`` rows (see ``LineTable.tiles`` and ``LineLayout.tiles``)
+# on a pool of threads; the numpy kernels of the scanners release the GIL.
+# The results of the tiles are merged in tile order such that they do not
+# depend on the number of threads.
+parallel_cells = 128 * 128
+tile_rows = 32
+_number_of_threads = cpu_count()
+_thread_pool = None
+
+def set_number_of_threads(number_of_threads):
+    "Set the number of threads that scan the tiles of large boards (1 scans sequentially)"
+    global _number_of_threads, _thread_pool
+    if _thread_pool is not None:
+        _thread_pool.close()
+        _thread_pool = None
+    _number_of_threads = max(int(number_of_threads), 1)
+
+def map_tiles(function, tiles):
+    """
+    Return the list of ``function(tile)`` for all `tiles` in the order of
+    `tiles`. Several tiles are processed on a pool of threads.
+
+    """
+    global _thread_pool
+    if len(tiles) < 2 or _number_of_threads < 2:
+        return [function(tile) for tile in tiles]
+    if _thread_pool is None:
+        _thread_pool = ThreadPool(_number_of_threads)
+    return _thread_pool.map(function, tiles)
+
+def join_tiles(parts, axis=0):
+    "Concatenate the results of ``map_tiles`` along `axis` (without a copy if there is only one tile)"
+    if len(parts) == 1:
+        return parts[0]
+    return np.concatenate(parts, axis=axis)
+
+def split_tiles(rows, number_of_cells):
+    """
+    Return a list of slices that split the sorted integer array `rows`
+    into tiles of entries with the same ``rows // tile_rows``; one slice
+    over all of `rows` if a board of `number_of_cells` positions is
+    smaller than ``parallel_cells``.
+
+    """
+    if number_of_cells < parallel_cells or not len(rows):
+        return [slice(0, len(rows))]
+    bounds = np.searchsorted(rows, np.arange(0, rows[-1] + 1, tile_rows)).tolist() + [len(rows)]
+    return [slice(start, stop) for start, stop in zip(bounds[:-1], bounds[1:]) if stop > start]
+
+class LineTable(object):
+    """
+    Table of all lines (windows) of `length` positions that fit onto a
+    board of the shape (`height`, `width`).
+    The lines are ordered by their starting position ``(y,x)`` (row by
+    row) and then by the direction as listed in ``directions``; i.e. in
+    the order in which a loop over all positions and all line getter
+    functions would find them.
+    Do not create instances yourself but use ``get_line_table``.
+
+    Attributes:
+
+    ``indices``:    (number of lines, `length`) array; the flat indices
+                    of the positions of each line into a board array
+    ``ys``, ``xs``: (number of lines, `length`) arrays; the coordinates
+                    of the positions of each line
+    ``directions``: (number of lines,) array; the index of the line's
+                    direction in ``directions``
+    ``cell_lines``: array; the indices of all lines that pass through the
+                    position with flat index ``i`` are
+                    ``cell_lines[cell_offsets[i]:cell_offsets[i+1]]``
+    ``cell_positions``: array; the index of the position within each of
+                    the lines in ``cell_lines``
+    ``tiles``:      list of slices of the lines starting in the same band
+                    of ``tile_rows`` rows (see ``map_tiles``); a single
+                    slice on small boards
+
+    """
+    def __init__(self, height, width, length):
+        self.shape = (height, width)
+        self.length = length
+
+        starts_y = []
+        starts_x = []
+        line_directions = []
+        for direction, (dy, dx) in enumerate(directions):
+            y, x = np.mgrid[0:height, 0:width]
+            end_y = y + dy * (length - 1)
+            end_x = x + dx * (length - 1)
+            valid = (end_y >= 0) & (end_y < height) & (end_x < width)
+            starts_y.append(y[valid])
+            starts_x.append(x[valid])
+            line_directions.append(np.full(valid.sum(), direction, dtype='int8'))
+        starts_y = np.concatenate(starts_y)
+        starts_x = np.concatenate(starts_x)
+        line_directions = np.concatenate(line_directions)
+
+        # sort by starting position first and direction second
+        order = np.lexsort((line_directions, starts_x, starts_y))
+        starts_y = starts_y[order]
+        starts_x = starts_x[order]
+        self.directions = line_directions[order]
+
+        steps = np.arange(length)
+        dy = np.array([direction[0] for direction in directions])[self.directions]
+        dx = np.array([direction[1] for direction in directions])[self.directions]
+        self.ys = starts_y[:,None] + dy[:,None] * steps
+        self.xs = starts_x[:,None] + dx[:,None] * steps
+        self.indices = self.ys * width + self.xs
+
+        # inverted index: position -> lines through that position
+        flat_indices = self.indices.ravel()
+        order = np.argsort(flat_indices, kind='mergesort')
+        self.cell_lines = np.repeat(np.arange(len(self.directions)), length)[order]
+        self.cell_positions = np.tile(np.arange(length), len(self.directions))[order]
+        self.cell_offsets = np.zeros(height * width + 1, dtype=int)
+        self.cell_offsets[1:] = np.cumsum(np.bincount(flat_indices, minlength=height * width))
+        self.tiles = split_tiles(starts_y, height * width)
+
+    def __len__(self):
+        return len(self.directions)
+
+    def lines_through(self, y, x):
+        "Return the indices of all lines that pass through the position (`y`,`x`)"
+        cell = y * self.shape[1] + x
+        return self.cell_lines[self.cell_offsets[cell]:self.cell_offsets[cell + 1]]
+
+    def positions_through(self, y, x):
+        "Return the index of the position (`y`,`x`) within each line of ``lines_through(y, x)``"
+        cell = y * self.shape[1] + x
+        return self.cell_positions[self.cell_offsets[cell]:self.cell_offsets[cell + 1]]
+
+    def positions(self, line):
+        "Return the list of the coordinates ``(y,x)`` of the `line`-th line"
+        return list(zip(self.ys[line].tolist(), self.xs[line].tolist()))
+
+_line_tables = {}
+def get_line_table(height, width, length=5):
+    """
+    Return the (cached) ``LineTable`` of all lines of `length` positions
+    on a board of the shape (`height`, `width`).
+
+    """
+    key = (height, width, length)
+    if key not in _line_tables:
+        _line_tables[key] = LineTable(height, width, length)
+    return _line_tables[key]
+
+class LineLayout(object):
+    """
+    Arrangement of the positions on a board of the shape (`height`,
+    `width`) in complete lines (whole rows, columns and diagonals) along
+    each of the four ``directions``; the board "sheared" such that every
+    direction runs along the second axis.
+    ``cells[d]`` is an integer array of the shape (number of lines,
+    longest line) holding the flat indices of the positions of the lines
+    in direction ``d``, padded with the index ``height * width`` of a
+    sentinel position that lies outside of the board.
+    ``rows[d]`` and ``columns[d]`` hold the row and the column of every
+    position (by flat index) in ``cells[d]``. ``tiles[d]`` is a list of
+    slices of the lines in direction ``d`` (see ``map_tiles``).
+    Do not create instances yourself but use ``get_line_layout``.
+
+    """
+    def __init__(self, height, width):
+        self.shape = (height, width)
+        self.sentinel = height * width
+        self.cells = []
+        self.rows = []
+        self.columns = []
+        self.tiles = []
+        for dy, dx in directions:
+            # the first position of each line is the one without a
+            # predecessor on the board
+            y, x = np.mgrid[0:height, 0:width]
+            previous_y, previous_x = y - dy, x - dx
+            first = ~((previous_y >= 0) & (previous_y < height) & (previous_x >= 0) & (previous_x < width))
+            longest = max(height, width) if dy and dx else (height if dy else width)
+            steps = np.arange(longest)
+            ys = y[first][:,None] + dy * steps
+            xs = x[first][:,None] + dx * steps
+            on_board = (ys >= 0) & (ys < height) & (xs < width)
+            cells = np.where(on_board, ys * width + xs, self.sentinel)
+            rows, columns = np.nonzero(on_board)
+            order = np.argsort(cells[rows, columns])
+            self.cells.append(cells)
+            self.rows.append(rows[order])
+            self.columns.append(columns[order])
+            self.tiles.append(split_tiles(np.arange(len(cells)), height * width))
+
+_line_layouts = {}
+def get_line_layout(height, width):
+    "Return the (cached) ``LineLayout`` of a board of the shape (`height`, `width`)"
+    key = (height, width)
+    if key not in _line_layouts:
+        _line_layouts[key] = LineLayout(height, width)
+    return _line_layouts[key]
+
+def window_sums(values, length):
+    """
+    Return the sums over all windows of `length` consecutive entries along
+    the last axis of `values` using one cumulative sum; the window
+    starting at index ``j`` is in column ``j`` of the result.
+
+    """
+    sums = np.zeros(values.shape[:-1] + (values.shape[-1] + 1,), dtype=np.promote_types(values.dtype, int))
+    np.cumsum(values, axis=-1, out=sums[...,1:])
+    return sums[...,length:] - sums[...,:-length]
+
+# packed positions (see ``Board.to_bytes``): a header followed by the
+# cells with 2 bits per cell, four cells per byte, in row-major order
+packed_header = struct.Struct('<3sBHHbIB') # magic, version, height, width, in_turn, number of stones, win length
+packed_magic = b'GMK'
+packed_version = 2
+# version 1 had no win length; such positions are read with a win length of 5
+packed_header_version_1 = struct.Struct('<3sBHHbI')
+packed_codes = {empty: 0, black: 1, white: 2}
+
+def pack_cells(arrays):
+    """
+    Pack the `arrays` of the shape (number of positions, number of cells)
+    holding ``empty``, ``black`` and ``white`` to 2 bits per cell.
+    Return an array of the shape (number of positions, number of bytes).
+
+    """
+    arrays = np.asarray(arrays)
+    codes = np.zeros((arrays.shape[0], -(-arrays.shape[1] // 4) * 4), dtype='uint8')
+    codes[:, :arrays.shape[1]][arrays == black] = packed_codes[black]
+    codes[:, :arrays.shape[1]][arrays == white] = packed_codes[white]
+    codes = codes.reshape(arrays.shape[0], -1, 4)
+    return codes[...,0] | (codes[...,1] << 2) | (codes[...,2] << 4) | (codes[...,3] << 6)
+
+def unpack_cells(packed, number_of_cells):
+    "Invert ``pack_cells``"
+    packed = np.asarray(packed, dtype='uint8')
+    codes = (packed[...,None] >> np.array([0, 2, 4, 6], dtype='uint8')) & 3
+    codes = codes.reshape(packed.shape[0], -1)[:, :number_of_cells]
+    if (codes == 3).any():
+        raise ValueError('Invalid cell code in packed position')
+    arrays = np.zeros(codes.shape, dtype='int8')
+    arrays[codes == packed_codes[black]] = black
+    arrays[codes == packed_codes[white]] = white
+    return arrays
+
+def packed_size(height, width, version=packed_version):
+    "Return the number of bytes of a packed position of the shape (`height`, `width`)"
+    header = packed_header if version == packed_version else packed_header_version_1
+    return header.size + -(-height * width // 4)
+
+def pack_boards(boards):
+    """
+    Pack the positions of all `boards` (which must be of the same shape)
+    into one contiguous buffer of fixed size records as written by
+    ``Board.to_bytes``.
+    Return the buffer as ``bytes``.
+
+    """
+    boards = list(boards)
+    if not boards:
+        return b''
+    height, width = boards[0].shape
+    win_length = boards[0].win_length
+    headers = []
+    for board in boards:
+        if board.shape != (height, width) or board.win_length != win_length:
+            raise ValueError('All boards must be of the same shape and win length')
+        headers.append(packed_header.pack(packed_magic, packed_version, height, width, board.in_turn,
+                                          height * width - board.moves_left, win_length))
+    headers = np.frombuffer(b''.join(headers), dtype='uint8').reshape(len(boards), -1)
+    cells = pack_cells(np.array([board.board.ravel() for board in boards]))
+    return np.hstack([headers, cells]).tobytes()
+
+def unpack_positions(buffer):
+    """
+    Unpack all positions from `buffer` as written by ``pack_boards`` or
+    ``Board.to_bytes``. The `buffer` may be any object supporting the
+    buffer protocol, e.g. a ``numpy.memmap``.
+    Return the array of the positions with the shape (number of
+    positions, height, width), the array of the colors in turn and the
+    win length.
+
+    """
+    if isinstance(buffer, np.ndarray):
+        data = buffer.view('uint8').ravel()
+    else:
+        data = np.frombuffer(buffer, dtype='uint8')
+    if not len(data):
+        return np.zeros((0, 0, 0), dtype='int8'), np.zeros(0, dtype='int8'), 5
+    if len(data) < packed_header_version_1.size or data[:3].tobytes() != packed_magic:
+        raise ValueError('Not a packed Gomoku position')
+    version = data[3]
+    if version == packed_version:
+        header = packed_header
+        win_length = data[packed_header.size - 1]
+    elif version == 1:
+        header = packed_header_version_1
+        win_length = 5
+    else:
+        raise ValueError('Unsupported version %i of packed position' % version)
+    magic, version, height, width = header.unpack(data[:header.size].tobytes())[:4]
+    record_size = packed_size(height, width, version)
+    if len(data) % record_size:
+        raise ValueError('Buffer size does not match the position size')
+    records = data.reshape(-1, record_size)
+
+    headers = records[:, :header.size]
+    if not (headers == headers[0]).all(axis=0)[:8].all() or not (headers[:, 13:] == headers[0, 13:]).all():
+        raise ValueError('All positions must be of the same shape and win length')
+    in_turn = headers[:, 8].view('int8')
+    positions = unpack_cells(records[:, header.size:], height * width)
+    number_of_stones = headers[:, 9:13].copy().view('<u4').ravel()
+    if ((positions != empty).sum(axis=1) != number_of_stones).any():
+        raise ValueError('Number of stones does not match the header')
+    return positions.reshape(-1, height, width), in_turn.copy(), int(win_length)
+
+def unpack_boards(buffer):
+    "Return the list of ``Board`` instances packed in `buffer` by ``pack_boards``"
+    positions, in_turn, win_length = unpack_positions(buffer)
+    boards = []
+    for position, color in zip(positions, in_turn):
+        board = Board(*position.shape, win_length=win_length)
+        board._load_array(position, color)
+        boards.append(board)
+    return boards
+
+_zobrist_keys = {}
+def get_zobrist_keys(height, width):
+    """
+    Return the (cached) random 64-bit keys used to hash positions on a
+    board of the shape (`height`, `width`). The keys of a black (white)
+    stone at the flat index ``i`` is ``keys[0,i]`` (``keys[1,i]``).
+    The keys are generated from a fixed seed and do not depend on the
+    global random state.
+
+    """
+    key = (height, width)
+    if key not in _zobrist_keys:
+        random_bytes = np.random.RandomState(height * 65537 + width).bytes(2 * height * width * 8)
+        _zobrist_keys[key] = np.frombuffer(random_bytes, dtype=np.uint64).reshape(2, height * width)
+    return _zobrist_keys[key]
+
 class Board(object):
     """
     Gomoku game board of the desired size (`height`, `width`).
     Can access and place stones as ``self[y,x]``, where ``y``
     denotes the vertical and ``x`` the horizontal index.
     Check if attempted moves are valid.
+    A player wins with `win_length` stones in a line (five by default).
+    The number of black and white stones in every line of the lengths
+    listed in ``counted_line_lengths`` (the win length and the win length
+    plus one) is kept up to date as stones are
+    placed (see ``get_line_counts``) and so is the 64-bit Zobrist ``hash``
+    of the position. Moves can be taken back with ``undo``.
+    The array ``neighbours`` holds the number of stones within a distance
+    of ``candidate_radius`` around each position and the empty positions
+    next to a stone (see ``candidate_moves``) as well as all empty
+    positions are kept in lists that are updated in O(1) per position
+    whose state changes; a random empty position is drawn in O(1) (see
+    ``random_empty``).
     Coordinate system:
 
      ------------->  x
@@ -33,21 +394,45 @@ class Board(object):
     y
 
     """
-    def __init__(self, height, width):
+    candidate_radius = 2
+
+    def __init__(self, height, width, win_length=5):
         self.height = int(height)
         self.width = int(width)
         self.shape = (self.height, self.width)
+        self.win_length = int(win_length)
+        self.counted_line_lengths = (self.win_length, self.win_length + 1)
         self.board = np.zeros(self.shape, dtype='int8')
+        self._line_views = {}
+        self.zobrist_keys = get_zobrist_keys(self.height, self.width)
 
         self.reset()
 
     def reset(self):
         self.board[:] = empty
+        self.line_counts = {}
+        for length in self.counted_line_lengths:
+            number_of_lines = len(self.get_line_table(length))
+            self.line_counts[length] = {black: np.zeros(number_of_lines, dtype='int8'),
+                                        white: np.zeros(number_of_lines, dtype='int8')}
         self.moves_left = self.height * self.width
         self.in_turn = white
         if hasattr(self, 'lastmove'):
             del self.lastmove
         self.log = []
+        self.hash = 0
+        self._winner = (None, [])
+        self._winner_moves = None
+        self.neighbours = np.zeros(self.shape, dtype='int16')
+        self._empty_cells = np.arange(self.height * self.width)
+        self._empty_index = np.arange(self.height * self.width)
+        # the first ``_number_of_candidates`` entries of ``_candidate_cells``
+        # are the empty positions next to a stone; plain lists since they
+        # are changed one entry at a time
+        self._is_candidate = [False] * (self.height * self.width)
+        self._candidate_cells = list(range(self.height * self.width))
+        self._candidate_index = list(range(self.height * self.width))
+        self._number_of_candidates = 0
 
     def __getitem__(self, key):
         return self.board[key]
@@ -60,6 +445,11 @@ class Board(object):
             self.board[key] = value
             self.lastmove = key
             self.log.append(key)
+            self._update_stone(key, value, +1)
+            if self._winner[0] is None:
+                self._winner = self._find_winning_line(key)
+                if self._winner[0] is not None:
+                    self._winner_moves = len(self.log)
 
         else: # invalid move
             if   self[key] != empty:
@@ -71,6 +461,236 @@ class Board(object):
             else:
                 raise RuntimeError('FATAL ERROR!')
 
+    def undo(self):
+        """
+        Take back the last move and return its position.
+        Restore ``board``, ``moves_left``, ``in_turn``, ``lastmove``,
+        ``log``, the line counts and the ``hash`` without copying the
+        board.
+
+        """
+        if not self.log:
+            raise InvalidMoveError('There is no move to take back')
+        key = self.log.pop()
+        color = self.board[key]
+        self.board[key] = empty
+        self.moves_left += 1
+        self.in_turn = color
+        if self.log:
+            self.lastmove = self.log[-1]
+        else:
+            del self.lastmove
+        self._update_stone(key, color, -1)
+        if self._winner_moves is not None and len(self.log) < self._winner_moves:
+            self._winner = (None, [])
+            self._winner_moves = None
+        return key
+
+    def _load_array(self, array, in_turn):
+        """
+        Set the position to `array` with `in_turn` to move and recompute
+        the line counts, the ``hash`` and the winner. The ``log`` is
+        cleared since the move order is unknown.
+
+        """
+        self.reset()
+        self.board[:] = array
+        self.in_turn = int(in_turn)
+        self.moves_left = self.height * self.width - np.count_nonzero(self.board)
+        flat_board = self.board.ravel()
+        for length, counts in self.line_counts.items():
+            table = self.get_line_table(length)
+            def count_stones(tile, table=table, counts=counts):
+                lines = flat_board[table.indices[tile]]
+                counts[black][tile] = (lines == black).sum(axis=1)
+                counts[white][tile] = (lines == white).sum(axis=1)
+            map_tiles(count_stones, table.tiles)
+        empty_cells = np.flatnonzero(flat_board == empty)
+        self._empty_cells = np.concatenate([empty_cells, np.flatnonzero(flat_board != empty)])
+        self._empty_index[self._empty_cells] = np.arange(self.height * self.width)
+
+        # count stones in the square around each position via cumulative sums
+        radius = self.candidate_radius
+        stones = np.zeros((self.height + 2 * radius + 1, self.width + 2 * radius + 1), dtype=int)
+        stones[radius + 1:radius + 1 + self.height, radius + 1:radius + 1 + self.width] = self.board != empty
+        stones = stones.cumsum(axis=0).cumsum(axis=1)
+        size = 2 * radius + 1
+        self.neighbours[:] = stones[size:, size:] - stones[:-size, size:] - stones[size:, :-size] + stones[:-size, :-size]
+        is_candidate = ((self.neighbours > 0) & (self.board == empty)).ravel()
+        self._is_candidate = is_candidate.tolist()
+        self._candidate_cells = np.concatenate([np.flatnonzero(is_candidate), np.flatnonzero(~is_candidate)]).tolist()
+        for index, cell in enumerate(self._candidate_cells):
+            self._candidate_index[cell] = index
+        self._number_of_candidates = int(np.count_nonzero(is_candidate))
+
+        for key_index, color in enumerate((black, white)):
+            self.hash ^= int(np.bitwise_xor.reduce(self.zobrist_keys[key_index, flat_board == color]))
+
+        number_black, number_white = self.get_line_counts()
+        winning_lines = np.flatnonzero((number_black == self.win_length) | (number_white == self.win_length))
+        if len(winning_lines):
+            positions = self.get_line_table().positions(winning_lines[0])
+            self._winner = (self.board[positions[0]], positions)
+
+    @classmethod
+    def from_array(cls, array, in_turn=None, win_length=5):
+        """
+        Return a new board holding the position `array`.
+        Raise ``AssertionError`` if `array` contains other values than
+        ``empty``, ``black`` and ``white``, if the number of stones is not
+        possible in a game where white begins or if there already is a
+        winning line. The ``log`` of the new board is empty.
+
+        :param array:
+
+            2D-array; e.g. [[white, empty],
+                            [black, black]]
+
+        :param in_turn:
+
+            The color to move, optional; by default white if there are
+            equally many black and white stones and black otherwise.
+
+        :param win_length:
+
+            integer, optional; the number of stones in a line that wins.
+
+        """
+        array = np.asarray(array)
+        if array.ndim != 2:
+            raise AssertionError('``array`` must be two dimensional')
+        is_black = array == black
+        is_white = array == white
+        if not (is_black | is_white | (array == empty)).all():
+            raise AssertionError("Invalid ``board_array``")
+
+        # in a valid board, there are equally many black and white stones or
+        # one more white that black stone since white begins
+        number_black = np.count_nonzero(is_black)
+        number_white = np.count_nonzero(is_white)
+        if number_white - number_black not in (0, 1):
+            raise AssertionError('Invalid number of stones: %i white and %i black' % (number_white, number_black))
+        if in_turn is None:
+            in_turn = white if number_white == number_black else black
+
+        board = cls(*array.shape, win_length=win_length)
+        board._load_array(array, in_turn)
+        if board.winner()[0] is not None:
+            raise AssertionError('There is a winning line at %s' % (board.winner()[1],))
+        return board
+
+    def to_bytes(self):
+        """
+        Return the position packed to 2 bits per cell preceded by a header
+        holding the shape, the color in turn, the number of stones and the
+        win length.
+        The ``log`` is not stored.
+
+        """
+        return pack_boards([self])
+
+    @classmethod
+    def from_bytes(cls, data):
+        "Return a new board holding the position packed by ``to_bytes``"
+        positions, in_turn, win_length = unpack_positions(data)
+        if len(positions) != 1:
+            raise ValueError('Expected exactly one packed position, got %i' % len(positions))
+        board = cls(*positions[0].shape, win_length=win_length)
+        board._load_array(positions[0], in_turn[0])
+        return board
+
+    def _update_stone(self, key, color, change):
+        """
+        Add `change` to the counts of `color` in all lines through `key`
+        and toggle the stone in the ``hash``.
+
+        """
+        y, x = key
+        y %= self.height
+        x %= self.width
+        for length, counts in self.line_counts.items():
+            counts[color][self.get_line_table(length).lines_through(y, x)] += change
+        self.hash ^= int(self.zobrist_keys[0 if color == black else 1, y * self.width + x])
+
+        radius = self.candidate_radius
+        top, left = max(y - radius, 0), max(x - radius, 0)
+        square = self.neighbours[top:y + radius + 1, left:x + radius + 1]
+        square += change
+        # besides (y,x) only the empty positions of the square whose first
+        # neighbour came or whose last neighbour went change between
+        # candidate and not
+        cell = y * self.width + x
+        if change > 0 and self._is_candidate[cell]:
+            self._toggle_candidate(cell)
+        threshold = 1 if change > 0 else 0
+        if square.min() == threshold:
+            for index in np.flatnonzero(square == threshold).tolist():
+                dy, dx = divmod(index, square.shape[1])
+                other_cell = (top + dy) * self.width + left + dx
+                if other_cell != cell and self.board.flat[other_cell] == empty:
+                    self._toggle_candidate(other_cell)
+        if change < 0 and square[y - top, x - left]:
+            self._toggle_candidate(cell)
+
+        # move the position behind (stone placed) or to the end (stone
+        # removed) of the empty positions in ``_empty_cells``
+        index = self._empty_index[cell]
+        new_index = self.moves_left if change > 0 else self.moves_left - 1
+        other_cell = self._empty_cells[new_index]
+        self._empty_cells[index], self._empty_cells[new_index] = other_cell, cell
+        self._empty_index[other_cell], self._empty_index[cell] = index, new_index
+
+    def _toggle_candidate(self, cell):
+        "Add the position with the flat index `cell` to the candidate moves or remove it"
+        index = self._candidate_index[cell]
+        if self._is_candidate[cell]:
+            self._number_of_candidates -= 1
+            new_index = self._number_of_candidates
+        else:
+            new_index = self._number_of_candidates
+            self._number_of_candidates += 1
+        other_cell = self._candidate_cells[new_index]
+        self._candidate_cells[index], self._candidate_cells[new_index] = other_cell, cell
+        self._candidate_index[other_cell], self._candidate_index[cell] = index, new_index
+        self._is_candidate[cell] = not self._is_candidate[cell]
+
+    def random_empty(self):
+        "Return a random empty position ``(y,x)`` drawn uniformly in O(1)"
+        if not self.moves_left:
+            raise InvalidMoveError('There is no empty position left')
+        return divmod(int(self._empty_cells[np.random.randint(self.moves_left)]), self.width)
+
+    def random_candidate(self):
+        """
+        Return a random empty position ``(y,x)`` next to a stone (see
+        ``candidate_cells``) drawn uniformly in O(1); any empty position
+        if there is none.
+
+        """
+        if not self._number_of_candidates:
+            return self.random_empty()
+        return divmod(self._candidate_cells[np.random.randint(self._number_of_candidates)], self.width)
+
+    def empty_positions(self):
+        "Return the array of the flat indices of all empty positions (unordered)"
+        return self._empty_cells[:self.moves_left]
+
+    def candidate_cells(self):
+        """
+        Return the array of the flat indices of the empty positions that
+        have a stone within a distance of ``candidate_radius`` (unordered).
+
+        """
+        return np.array(self._candidate_cells[:self._number_of_candidates], dtype=int)
+
+    def candidate_moves(self):
+        """
+        Return the list of the empty positions ``(y,x)`` that have a stone
+        within a distance of ``candidate_radius`` in row-major order.
+
+        """
+        return [divmod(int(cell), self.width) for cell in np.sort(self.candidate_cells())]
+
     def full(self):
         "Return bool that indicates if the board has empty fields left"
         if self.moves_left:
@@ -79,12 +699,14 @@ class Board(object):
             return True
 
     get_line_functions_docstring = """
-    Return an array from the position passed via `x` and `y` of length 5
-    and a list of the coordinates of that line.
+    Return an array from the position passed via `x` and `y` of `length`
+    (by default the win length) and a list of the coordinates of that
+    line.
 
     .. note::
 
-        The returned array is bound to the instance and NOT a copy.
+        The returned array is a read-only view bound to the instance
+        and NOT a copy.
 
     :param y, x:
 
@@ -93,54 +715,302 @@ class Board(object):
 
     """
 
-    def get_column(self, y, x, length=5):
+    def get_line_views(self, length=None):
+        """
+        Return a list of read-only views of all lines of `length` on the
+        board; one view per direction as ordered in ``directions``.
+        Each view has the shape (number of start rows, number of start
+        columns, `length`) and shares the memory of ``board``, i.e. all
+        lines of one direction can be read without any copy.
+        The line ``views[d][i,j]`` starts at the position ``(i,j)``
+        except for the diagonals lowleft to upright (``d = 3``) that start
+        at ``(i + length - 1, j)``. By default `length` is the win length.
+
+        """
+        if length is None:
+            length = self.win_length
+        if length not in self._line_views:
+            as_strided = np.lib.stride_tricks.as_strided
+            row_stride, column_stride = self.board.strides
+            starts = max(self.height - length + 1, 0), max(self.width - length + 1, 0)
+            views = [as_strided(self.board, (starts[0], self.width, length),
+                                (row_stride, column_stride, row_stride), writeable=False),
+                     as_strided(self.board, (self.height, starts[1], length),
+                                (row_stride, column_stride, column_stride), writeable=False),
+                     as_strided(self.board, (starts[0], starts[1], length),
+                                (row_stride, column_stride, row_stride + column_stride), writeable=False),
+                     as_strided(self.board[min(length - 1, self.height):], (starts[0], starts[1], length),
+                                (row_stride, column_stride, column_stride - row_stride), writeable=False)]
+            self._line_views[length] = views
+        return self._line_views[length]
+
+    def _get_line(self, direction, y, x, length):
+        "Return the line of `direction` starting at (`y`,`x`) from the line views"
+        if length is None:
+            length = self.win_length
+        view = self.get_line_views(length)[direction]
+        i = y - (length - 1 if direction == 3 else 0)
+        if not (0 <= i < view.shape[0] and 0 <= x < view.shape[1]):
+            raise IndexError
+        dy, dx = directions[direction]
+        return view[i,x], [(y+dy*k, x+dx*k) for k in range(length)]
+
+    def get_column(self, y, x, length=None):
         __doc__ = self.get_line_functions_docstring
-        line = np.empty(length, dtype='int8')
-        for i in range(length):
-            line[i] = self[y+i,x]
-        return line, [(y+i,x) for i in range(length)]
+        return self._get_line(0, y, x, length)
 
-    def get_row(self, y, x, length=5):
+    def get_row(self, y, x, length=None):
         __doc__ = self.get_line_functions_docstring
-        line = np.empty(length, dtype='int8')
-        for i in range(length):
-            line[i] = self[y,x+i]
-        return line, [(y,x+i) for i in range(length)]
+        return self._get_line(1, y, x, length)
 
-    def get_diagonal_upleft_to_lowright(self, y, x, length=5):
+    def get_diagonal_upleft_to_lowright(self, y, x, length=None):
         __doc__ = self.get_line_functions_docstring
-        line = np.empty(length, dtype='int8')
-        for i in range(length):
-            line[i] = self[y+i,x+i]
-        return line, [(y+i,x+i) for i in range(length)]
+        return self._get_line(2, y, x, length)
 
-    def get_diagonal_lowleft_to_upright(self, y, x, length=5):
+    def get_diagonal_lowleft_to_upright(self, y, x, length=None):
         __doc__ = self.get_line_functions_docstring
-        line = np.empty(length, dtype='int8')
-        if y < length - 1:
-            raise IndexError
-        for i in range(length):
-            line[i] = self[y-i,x+i]
-        return line, [(y-i,x+i) for i in range(length)]
+        return self._get_line(3, y, x, length)
+
+    # directions (dy, dx) of the lines through a position in the order
+    # row, column, diagonal lowleft to upright, diagonal upleft to lowright
+    line_directions = ((0, 1), (1, 0), (-1, 1), (1, 1))
+
+    def _find_winning_line(self, key):
+        """
+        Return the color and the positions of the first winning line
+        through the position `key` or ``(None, [])``.
+        The line counts of the lines through `key` tell in one lookup if
+        there is a winning line at all; only then the four directions
+        are walked to report the line from its first stone.
+
+        """
+        y, x = key
+        y %= self.height
+        x %= self.width
+        color = self.board[y,x]
+        lines = self.get_line_table().lines_through(y, x)
+        if not (self.line_counts[self.win_length][color][lines] == self.win_length).any():
+            return None, []
+        for dy, dx in self.line_directions:
+            # go back to the first stone of the run through (y,x)
+            start_y, start_x = y, x
+            while 0 <= start_y - dy < self.height and 0 <= start_x - dx < self.width \
+                    and self.board[start_y - dy, start_x - dx] == color:
+                start_y -= dy
+                start_x -= dx
+            positions = []
+            current_y, current_x = start_y, start_x
+            while 0 <= current_y < self.height and 0 <= current_x < self.width \
+                    and self.board[current_y, current_x] == color and len(positions) < self.win_length:
+                positions.append((current_y, current_x))
+                current_y += dy
+                current_x += dx
+            if len(positions) == self.win_length:
+                return color, positions
+        return None, []
+
+    def get_line_table(self, length=None):
+        "Return the ``LineTable`` of all lines of `length` (by default the win length) on this board"
+        if length is None:
+            length = self.win_length
+        return get_line_table(self.height, self.width, length)
+
+    def get_lines(self, length=None, selection=None):
+        """
+        Return an array with the contents of all lines of `length` (by
+        default the win length) on the board and the corresponding
+        ``LineTable``.
+        Row ``i`` of the array is the line ``i`` of the table.
+
+        :param selection:
+
+            array of line indices, optional; if passed, only return the
+            contents of the selected lines (in the order of `selection`).
+
+        """
+        table = self.get_line_table(length)
+        if selection is None:
+            return self.board.ravel()[table.indices], table
+        return self.board.ravel()[table.indices[selection]], table
+
+    def get_line_counts(self, length=None):
+        """
+        Return two arrays with the number of black and white stones in
+        each line of `length` (by default the win length; indexed as in
+        the ``LineTable``).
+        For the lengths in ``counted_line_lengths`` the counts are
+        maintained incrementally, other lengths are counted on demand by
+        cumulative sums along the rows, columns and diagonals (see
+        ``LineLayout``, in tiles on large boards) such that the cost does
+        not grow with `length`.
+
+        """
+        if length is None:
+            length = self.win_length
+        if length in self.line_counts:
+            counts = self.line_counts[length]
+            return counts[black], counts[white]
+        table = self.get_line_table(length)
+        layout = get_line_layout(self.height, self.width)
+        starts = table.indices[:,0]
+        cells = np.append(self.board.ravel(), empty)
+        counts = []
+        for color in (black, white):
+            number = np.zeros(len(table), dtype=int)
+            stones = cells == color
+            for direction, line_cells in enumerate(layout.cells):
+                in_direction = table.directions == direction
+                start_cells = starts[in_direction]
+                sums = join_tiles(map_tiles(lambda tile: window_sums(stones[line_cells[tile]], length),
+                                            layout.tiles[direction]))
+                number[in_direction] = sums[layout.rows[direction][start_cells], layout.columns[direction][start_cells]]
+            counts.append(number)
+        return tuple(counts)
 
     def winner(self):
         """
-        Return the winner and the positions of the five in a line or None.
+        Return the winner and the positions of the winning line or None.
 
         .. note::
 
-            If there are multiple lines of five, the first line that is found
-            will be designated as winner. Therefore you should check for winner
-            after EVERY move.
+            The winner is determined incrementally when a stone is placed
+            by checking the lines through that stone only. If there are
+            multiple winning lines, the first line that has been completed
+            will be designated as winner.
 
         """
-        for i in range(self.height):
-            for j in range(self.width):
-                for getter_function in (self.get_row, self.get_column, self.get_diagonal_lowleft_to_upright, self.get_diagonal_upleft_to_lowright):
-                    try:
-                        line, positions = getter_function(i,j)
-                    except IndexError:
-                        continue
-                    if abs(line.sum()) == 5:
-                        return line[0], positions
-        return None, []
+        return self._winner
+
+    def winning_moves(self, color):
+        """
+        Return the positions where a stone of `color` completes a winning
+        line (all but one position of a line taken) sorted by row and
+        column; read from the line counts.
+
+        """
+        k = self.win_length
+        counts = self.line_counts[k]
+        lines = np.flatnonzero((counts[color] == k - 1) & (counts[-color] == 0))
+        if not len(lines):
+            return []
+        cells = self.get_line_table().indices[lines].ravel()
+        cells = np.unique(cells[self.board.ravel()[cells] == empty])
+        return [divmod(int(cell), self.width) for cell in cells]
+
+def in_a_row(stones, length=5):
+    """
+    Return a boolean array that indicates if there are `length` ``True``
+    in a line in the boolean `stones` of the shape (..., height, width).
+    The runs are found by cumulative sums along the rows, columns and
+    diagonals (see ``LineLayout``) such that the cost does not grow with
+    `length`.
+
+    """
+    height, width = stones.shape[-2:]
+    layout = get_line_layout(height, width)
+    # the stones followed by the (empty) sentinel position
+    cells = np.zeros(stones.shape[:-2] + (height * width + 1,), dtype='int8')
+    cells[..., :-1] = stones.reshape(stones.shape[:-2] + (height * width,))
+    found = np.zeros(stones.shape[:-2], dtype=bool)
+    for line_cells, tiles in zip(layout.cells, layout.tiles):
+        def find_in_tile(tile):
+            return (window_sums(cells[..., line_cells[tile]], length) == length).any(axis=(-2,-1))
+        for found_in_tile in map_tiles(find_in_tile, tiles):
+            found |= found_in_tile
+    return found
+
+class BoardBatch(object):
+    """
+    Container for `number_of_games` Gomoku games on boards of the shape
+    (`height`, `width`) won with `win_length` stones in a line. All
+    positions are stored in the array ``boards`` of the shape
+    (`number_of_games`, `height`, `width`); ``in_turn`` and
+    ``moves_left`` are arrays with one entry per game and ``logs`` holds
+    one move list per game.
+    Moves are applied to all games at once via ``play`` and the winners
+    of all games are determined in one vectorized pass by ``winners``.
+
+    """
+    def __init__(self, number_of_games, height, width, win_length=5):
+        self.number_of_games = int(number_of_games)
+        self.height = int(height)
+        self.width = int(width)
+        self.win_length = int(win_length)
+        self.shape = (self.height, self.width)
+        self.boards = np.zeros((self.number_of_games,) + self.shape, dtype='int8')
+        self.in_turn = np.empty(self.number_of_games, dtype='int8')
+        self.moves_left = np.empty(self.number_of_games, dtype=int)
+
+        self.reset()
+
+    def reset(self):
+        self.boards[:] = empty
+        self.in_turn[:] = white
+        self.moves_left[:] = self.height * self.width
+        self.logs = [[] for i in range(self.number_of_games)]
+
+    def __len__(self):
+        return self.number_of_games
+
+    def play(self, moves, selection=None):
+        """
+        Place a stone of the color in turn in every game.
+
+        :param moves:
+
+            array of the shape (number of games, 2); the position ``(y,x)``
+            where to place the stone in each game.
+
+        :param selection:
+
+            boolean array of the shape (number of games,), optional; if
+            passed, only play in the games where `selection` is ``True``.
+            The corresponding rows of `moves` are ignored otherwise.
+
+        """
+        moves = np.asarray(moves, dtype=int)
+        games = np.arange(self.number_of_games)
+        if selection is not None:
+            games = games[np.asarray(selection, dtype=bool)]
+            moves = moves[games]
+        y, x = moves[:,0], moves[:,1]
+
+        taken = self.boards[games, y, x] != empty
+        if taken.any():
+            first = np.argmax(taken)
+            raise InvalidMoveError('Position %s is already taken in game %i' % (tuple(moves[first].tolist()), games[first]))
+
+        self.boards[games, y, x] = self.in_turn[games]
+        self.in_turn[games] *= -1
+        self.moves_left[games] -= 1
+        for game, move in zip(games.tolist(), moves.tolist()):
+            self.logs[game].append(tuple(move))
+
+    def full(self):
+        "Return boolean array that indicates if the boards have no empty fields left"
+        return self.moves_left == 0
+
+    def winners(self):
+        """
+        Return an array with the winner of each game or ``empty`` if there
+        is no winning line.
+
+        .. note::
+
+            If a board contains winning lines of both colors, black is
+            reported. Stop playing a game once it has a winner.
+
+        """
+        black_wins = in_a_row(self.boards == black, self.win_length)
+        white_wins = in_a_row(self.boards == white, self.win_length)
+        winners = np.full(self.number_of_games, empty, dtype='int8')
+        winners[white_wins] = white
+        winners[black_wins] = black
+        return winners
+
+    def get_board(self, game):
+        "Return a ``Board`` holding the position of the `game`-th game"
+        board = Board(self.height, self.width, self.win_length)
+        for move in self.logs[game]:
+            board[move] = board.in_turn
+        return board
@@ -1,6 +1,7 @@
 "Unit test for the game-board class"
 
 import unittest
+from . import board as board_module
 from .board import *
 
 def place_stone(board, color, x, y):
@@ -117,6 +118,43 @@ class TestBoard(unittest.TestCase):
         self.assertEqual(board.winner()[0], white)
         self.assertEqual(board.winner()[1], [(1,2), (1,3), (1,4), (1,5), (1,6)])
 
+    def test_winner_diagonal(self):
+        width = height= 10
+        board = Board(width, height)
+
+        # white builds a diagonal from lower left to upper right, the
+        # stone completing the five is placed in the middle of the line
+        white_moves = [(6,1), (5,2), (3,4), (2,5), (4,3)]
+        black_moves = [(0,0), (0,1), (0,2), (0,3)]
+        for i, white_move in enumerate(white_moves):
+            board[white_move] = white
+            if i < len(black_moves):
+                self.assertEqual(board.winner(), (None, []))
+                board[black_moves[i]] = black
+        self.assertEqual(board.winner()[0], white)
+        self.assertEqual(board.winner()[1], [(6,1), (5,2), (4,3), (3,4), (2,5)])
+
+        board.reset()
+        self.assertEqual(board.winner(), (None, []))
+
+    def test_win_length(self):
+        np.random.seed(5678)
+        for win_length in (3, 4, 6, 7):
+            for game in range(5):
+                board = Board(8, 9, win_length)
+                while board.winner()[0] is None and not board.full():
+                    board[board.random_empty()] = board.in_turn
+                winner, positions = board.winner()
+                if winner is None:
+                    continue
+                self.assertEqual(len(positions), win_length)
+                for position in positions:
+                    self.assertEqual(board[position], winner)
+                # no winning line before the last move
+                board.undo()
+                for lines in board.get_line_views(win_length):
+                    self.assertFalse((np.abs(lines.sum(axis=-1)) == win_length).any())
+
 class TestGetLine(unittest.TestCase):
     def setUp(self):
         self.target_shape = (5,)
@@ -204,3 +242,355 @@ class TestGetLine(unittest.TestCase):
         line, positions = self.board.get_diagonal_lowleft_to_upright(4,0)
         np.testing.assert_equal(line, [white, black, white, black, white])
         np.testing.assert_equal(positions, [(4,0), (3,1), (2,2), (1,3), (0,4)])
+
+class TestLineTable(unittest.TestCase):
+    def test_table_matches_getters(self):
+        board = Board(height=6, width=7)
+        place_stone(board, white, 3, 4)
+        place_stone(board, black, 0, 6)
+
+        for length in (3, 5, 6):
+            lines, table = board.get_lines(length)
+            self.assertTrue(table is get_line_table(6, 7, length)) # cached?
+
+            expected_directions = []
+            expected_positions = []
+            for i in range(board.height):
+                for j in range(board.width):
+                    for direction, getter_function in enumerate((board.get_column, board.get_row, board.get_diagonal_upleft_to_lowright, board.get_diagonal_lowleft_to_upright)):
+                        try:
+                            line, positions = getter_function(i, j, length=length)
+                        except IndexError:
+                            continue
+                        np.testing.assert_equal(lines[len(expected_positions)], line)
+                        expected_directions.append(direction)
+                        expected_positions.append(positions)
+
+            self.assertEqual(len(table), len(expected_positions))
+            np.testing.assert_equal(table.directions, expected_directions)
+            self.assertEqual([table.positions(i) for i in range(len(table))], expected_positions)
+
+    def test_line_counts(self):
+        np.random.seed(3141)
+        board = Board(height=9, width=8)
+        while board.moves_left > 20:
+            y, x = np.random.randint(board.height), np.random.randint(board.width)
+            if board[y,x] == empty:
+                board[y,x] = board.in_turn
+            for length in board.counted_line_lengths:
+                lines, table = board.get_lines(length)
+                number_black, number_white = board.get_line_counts(length)
+                np.testing.assert_equal(number_black, (lines == black).sum(axis=1))
+                np.testing.assert_equal(number_white, (lines == white).sum(axis=1))
+
+        table = board.get_line_table(5)
+        expected_lines = [line for line in range(len(table)) if (4, 3) in table.positions(line)]
+        self.assertEqual(sorted(table.lines_through(4, 3)), expected_lines)
+        for line, position in zip(table.lines_through(4, 3), table.positions_through(4, 3)):
+            self.assertEqual(table.positions(line)[position], (4, 3))
+
+        board.reset()
+        for length in board.counted_line_lengths:
+            for counts in board.get_line_counts(length):
+                self.assertFalse(counts.any())
+
+    def test_uncounted_lengths(self):
+        np.random.seed(2718)
+        board = Board(height=9, width=8, win_length=4)
+        self.assertEqual(board.counted_line_lengths, (4, 5))
+        for i in range(30):
+            board[board.random_empty()] = board.in_turn
+        for length in (2, 3, 4, 5, 6, 9):
+            lines, table = board.get_lines(length)
+            number_black, number_white = board.get_line_counts(length)
+            np.testing.assert_equal(number_black, (lines == black).sum(axis=1))
+            np.testing.assert_equal(number_white, (lines == white).sum(axis=1))
+
+class TestUndo(unittest.TestCase):
+    def test_undo(self):
+        np.random.seed(8642)
+        board = Board(height=8, width=9)
+        hashes = [board.hash]
+        boards = [board.board.copy()]
+        counts = [board.get_line_counts(5)[0].copy()]
+        while board.winner()[0] is None:
+            y, x = np.random.randint(board.height), np.random.randint(board.width)
+            if board[y,x] != empty:
+                continue
+            board[y,x] = board.in_turn
+            self.assertNotEqual(board.hash, hashes[-1])
+            hashes.append(board.hash)
+            boards.append(board.board.copy())
+            counts.append(board.get_line_counts(5)[0].copy())
+
+        log = list(board.log)
+        self.assertEqual(board.undo(), log[-1])
+        self.assertEqual(board.winner(), (None, []))
+        for i in range(len(log) - 1, 0, -1):
+            self.assertEqual(board.hash, hashes[i])
+            np.testing.assert_equal(board.board, boards[i])
+            np.testing.assert_equal(board.get_line_counts(5)[0], counts[i])
+            self.assertEqual(board.log, log[:i])
+            self.assertEqual(board.lastmove, log[i-1])
+            self.assertEqual(board.moves_left, board.height * board.width - i)
+            self.assertEqual(board.in_turn, white if i % 2 == 0 else black)
+            board.undo()
+
+        self.assertEqual(board.hash, 0)
+        self.assertFalse(hasattr(board, 'lastmove'))
+        self.assertRaises(InvalidMoveError, board.undo)
+
+    def test_hash_independent_of_move_order(self):
+        board1 = Board(height=6, width=6)
+        board2 = Board(height=6, width=6)
+        for key, color in [((0,0), white), ((1,1), black), ((2,2), white), ((3,3), black)]:
+            board1[key] = color
+        for key, color in [((2,2), white), ((3,3), black), ((0,0), white), ((1,1), black)]:
+            board2[key] = color
+        self.assertEqual(board1.hash, board2.hash)
+
+class TestBoardBatch(unittest.TestCase):
+    def test_random_games(self):
+        np.random.seed(97531)
+        self.play_random_games(30, 5)
+
+    def test_win_length(self):
+        np.random.seed(86420)
+        for win_length in (4, 6):
+            self.play_random_games(10, win_length)
+
+    def play_random_games(self, number_of_games, win_length):
+        batch = BoardBatch(number_of_games, 7, 9, win_length)
+        boards = [Board(7, 9, win_length) for i in range(number_of_games)]
+
+        running = np.ones(number_of_games, dtype=bool)
+        while running.any():
+            moves = np.empty((number_of_games, 2), dtype=int)
+            for i, board in enumerate(boards):
+                if not running[i]:
+                    continue
+                empty_positions = np.argwhere(board.board == empty)
+                moves[i] = empty_positions[np.random.randint(len(empty_positions))]
+                board[tuple(moves[i])] = board.in_turn
+            batch.play(moves, running)
+
+            winners = batch.winners()
+            for i, board in enumerate(boards):
+                np.testing.assert_equal(batch.boards[i], board.board)
+                self.assertEqual(batch.in_turn[i], board.in_turn)
+                self.assertEqual(batch.moves_left[i], board.moves_left)
+                self.assertEqual(batch.logs[i], board.log)
+                self.assertEqual(winners[i], board.winner()[0] or empty)
+            running &= (winners == empty) & ~batch.full()
+
+        np.testing.assert_equal(batch.get_board(3).board, boards[3].board)
+
+    def test_invalid_move(self):
+        batch = BoardBatch(2, 5, 5)
+        batch.play([(1, 1), (2, 2)])
+        self.assertRaisesRegexp(InvalidMoveError, r'Position \(2, 2\) is already taken in game 1', batch.play, [(0, 0), (2, 2)])
+
+class TestPackedPositions(unittest.TestCase):
+    def setUp(self):
+        np.random.seed(1357)
+        self.boards = []
+        for number_of_stones in range(0, 40, 3):
+            board = Board(height=7, width=9)
+            while len(board.log) < number_of_stones:
+                y, x = np.random.randint(board.height), np.random.randint(board.width)
+                if board[y,x] == empty:
+                    board[y,x] = board.in_turn
+            self.boards.append(board)
+
+    def assert_same_position(self, board, target_board):
+        np.testing.assert_equal(board.board, target_board.board)
+        self.assertEqual(board.in_turn, target_board.in_turn)
+        self.assertEqual(board.moves_left, target_board.moves_left)
+        self.assertEqual(board.hash, target_board.hash)
+        self.assertEqual(board.winner()[0], target_board.winner()[0])
+        for length in board.counted_line_lengths:
+            for counts, target_counts in zip(board.get_line_counts(length), target_board.get_line_counts(length)):
+                np.testing.assert_equal(counts, target_counts)
+
+    def test_single_board(self):
+        for board in self.boards:
+            data = board.to_bytes()
+            self.assertEqual(len(data), 8 + 6 + 16) # header + 63 cells at 2 bits
+            new_board = Board.from_bytes(data)
+            self.assert_same_position(new_board, board)
+            self.assertEqual(new_board.log, [])
+
+    def test_bulk(self):
+        data = pack_boards(self.boards)
+        self.assertEqual(len(data), len(self.boards) * packed_size(7, 9))
+
+        positions, in_turn, win_length = unpack_positions(bytearray(data))
+        np.testing.assert_equal(positions, [board.board for board in self.boards])
+        np.testing.assert_equal(in_turn, [board.in_turn for board in self.boards])
+        self.assertEqual(win_length, 5)
+
+        for board, target_board in zip(unpack_boards(data), self.boards):
+            self.assert_same_position(board, target_board)
+
+    def test_invalid_data(self):
+        data = bytearray(self.boards[0].to_bytes()) # empty board
+        self.assertRaises(ValueError, Board.from_bytes, bytes(data[:-1]))
+        data[-1] = 1 # black stone in the last row
+        self.assertRaisesRegexp(ValueError, 'Number of stones', Board.from_bytes, bytes(data))
+        data[-1] = 3
+        self.assertRaisesRegexp(ValueError, 'Invalid cell code', Board.from_bytes, bytes(data))
+        self.assertRaisesRegexp(ValueError, 'Not a packed', Board.from_bytes, b'XYZ' + bytes(data[3:]))
+
+    def test_win_length(self):
+        board = Board(7, 9, win_length=4)
+        board[3,3] = white
+        new_board = Board.from_bytes(board.to_bytes())
+        self.assertEqual(new_board.win_length, 4)
+        self.assert_same_position(new_board, board)
+        self.assertRaises(ValueError, pack_boards, [board, Board(7, 9)])
+
+    def test_version_1(self):
+        board = self.boards[1]
+        header = packed_header_version_1.pack(packed_magic, 1, 7, 9, board.in_turn, 63 - board.moves_left)
+        data = header + board.to_bytes()[packed_header.size:]
+        self.assertEqual(len(data), packed_size(7, 9, version=1))
+        new_board = Board.from_bytes(data)
+        self.assertEqual(new_board.win_length, 5)
+        self.assert_same_position(new_board, board)
+
+class TestLineViews(unittest.TestCase):
+    def test_views_share_memory(self):
+        board = Board(height=7, width=8)
+        line, positions = board.get_diagonal_lowleft_to_upright(6, 1)
+        self.assertTrue(np.shares_memory(line, board.board))
+        self.assertFalse(line.flags.writeable)
+        place_stone(board, white, 4, 3)
+        np.testing.assert_equal(line, [empty, empty, white, empty, empty])
+
+        for length in (2, 5, 6):
+            views = board.get_line_views(length)
+            lines, table = board.get_lines(length)
+            self.assertEqual(sum(view.shape[0] * view.shape[1] for view in views), len(table))
+            for direction, view in enumerate(views):
+                self.assertTrue(np.shares_memory(view, board.board))
+                for i in range(view.shape[0]):
+                    for j in range(view.shape[1]):
+                        y = i + length - 1 if direction == 3 else i
+                        dy, dx = directions[direction]
+                        np.testing.assert_equal(view[i,j], [board[y + dy * k, j + dx * k] for k in range(length)])
+
+    def test_small_board(self):
+        board = Board(height=3, width=3)
+        for view in board.get_line_views(5):
+            self.assertEqual(view.size, 0)
+        self.assertRaises(IndexError, board.get_row, 0, 0)
+
+class TestCandidates(unittest.TestCase):
+    def assert_consistent(self, board):
+        radius = board.candidate_radius
+        for i in range(board.height):
+            for j in range(board.width):
+                square = board.board[max(i-radius,0):i+radius+1, max(j-radius,0):j+radius+1]
+                self.assertEqual(board.neighbours[i,j], (square != empty).sum())
+        self.assertEqual(sorted(board.empty_positions()), list(np.flatnonzero(board.board == empty)))
+        target_candidates = [(i,j) for i in range(board.height) for j in range(board.width)
+                             if board[i,j] == empty and board.neighbours[i,j]]
+        self.assertEqual(board.candidate_moves(), target_candidates)
+        self.assertEqual(sorted(board.candidate_cells()), [i * board.width + j for i, j in target_candidates])
+        if target_candidates:
+            self.assertTrue(board.random_candidate() in target_candidates)
+
+    def test_place_and_undo(self):
+        np.random.seed(2468)
+        board = Board(height=8, width=11)
+        self.assertEqual(board.candidate_moves(), [])
+        for i in range(30):
+            position = board.random_empty()
+            self.assertEqual(board[position], empty)
+            board[position] = board.in_turn
+            self.assert_consistent(board)
+        for i in range(12):
+            board.undo()
+            self.assert_consistent(board)
+
+        reloaded_board = Board.from_bytes(board.to_bytes())
+        self.assert_consistent(reloaded_board)
+        np.testing.assert_equal(reloaded_board.neighbours, board.neighbours)
+
+    def test_fill_board(self):
+        board = Board(height=3, width=4)
+        while not board.full():
+            board[board.random_empty()] = board.in_turn
+        self.assertRaises(InvalidMoveError, board.random_empty)
+
+class TestFromArray(unittest.TestCase):
+    def test_from_array(self):
+        array = [[empty, black, empty, empty, empty, empty],
+                 [white, white, empty, white, empty, empty],
+                 [empty, black, empty, empty, empty, empty]]
+        board = Board.from_array(array)
+
+        np.testing.assert_equal(board.board, array)
+        self.assertEqual(board.in_turn, black)
+        self.assertEqual(board.moves_left, 6 * 3 - 5)
+        self.assertEqual(board.log, [])
+
+        # same position built by placing stones
+        target_board = Board(3, 6)
+        for key in [(1,0), (0,1), (1,1), (2,1), (1,3)]:
+            target_board[key] = target_board.in_turn
+        self.assertEqual(board.hash, target_board.hash)
+        np.testing.assert_equal(board.neighbours, target_board.neighbours)
+        np.testing.assert_equal(board.get_line_counts(5), target_board.get_line_counts(5))
+
+        board[2,2] = black
+        self.assertEqual(board.log, [(2,2)])
+
+    def test_invalid_arrays(self):
+        self.assertRaises(AssertionError, Board.from_array, [white, black])
+        self.assertRaises(AssertionError, Board.from_array, [[white, 2], [black, empty]])
+        self.assertRaisesRegexp(AssertionError, 'number of stones', Board.from_array, [[white, white], [empty, empty]])
+        self.assertRaisesRegexp(AssertionError, 'number of stones', Board.from_array, [[black, empty], [empty, empty]])
+        self.assertRaisesRegexp(AssertionError, 'winning line', Board.from_array,
+                                [[black, black, black, black, empty],
+                                 [white, white, white, white, white]])
+
+class TestTiles(unittest.TestCase):
+    def setUp(self):
+        # scan even small boards in tiles on several threads
+        self.parallel_cells = board_module.parallel_cells
+        self.number_of_threads = board_module._number_of_threads
+        board_module.parallel_cells = 0
+        set_number_of_threads(3)
+
+    def tearDown(self):
+        board_module.parallel_cells = self.parallel_cells
+        set_number_of_threads(self.number_of_threads)
+
+    def test_line_table_tiles(self):
+        table = get_line_table(75, 41, 6)
+        self.assertTrue(len(table.tiles) > 1)
+        self.assertEqual(table.tiles[0].start, 0)
+        self.assertEqual(table.tiles[-1].stop, len(table))
+        for tile, next_tile in zip(table.tiles[:-1], table.tiles[1:]):
+            self.assertEqual(tile.stop, next_tile.start)
+        for tile in table.tiles:
+            self.assertEqual(len(np.unique(table.ys[tile,0] // tile_rows)), 1)
+
+    def test_tiled_scans(self):
+        np.random.seed(1357)
+        board = Board(75, 41)
+        while board.moves_left > 2000:
+            board[board.random_empty()] = board.in_turn
+            if board.winner()[0] is not None:
+                board.undo()
+        loaded_board = Board.from_array(board.board)
+        for length in (5, 6, 8):
+            lines, table = board.get_lines(length)
+            for counts, color in zip(loaded_board.get_line_counts(length), (black, white)):
+                np.testing.assert_equal(counts, (lines == color).sum(axis=1))
+        self.assertEqual(loaded_board.winner(), board.winner())
+
+        stones = np.array([board.board == black, board.board == white, np.zeros(board.shape, dtype=bool)])
+        stones[2,40,3:8] = True
+        np.testing.assert_equal(in_a_row(stones, 5), [board.winner()[0] == black, board.winner()[0] == white, True])
@@ -3,14 +3,19 @@
 from __future__ import print_function
 from ..board import InvalidMoveError
 from .lib import Playerlibrary
+from .engine import RuleEngine
 
 
 # base class
 class Player(Playerlibrary):
     """
     Describtion of a player to be used in the Game.
-    To implement your own AI, override the function
-    ``_make_move``.
+    To implement your own AI, list the names of the rules of the
+    ``Playerlibrary`` in the order of priority in ``rules`` (they are
+    executed by a ``RuleEngine``, see "engine.py") or override the
+    function ``choose_move`` that returns the position to play on a board
+    without changing it (and optionally ``rank_moves``). Players that
+    need the gui override ``_make_move`` instead.
     .. important::
         Note the leading underscore. Do *NOT* override ``make_move``.
     The member string ``name`` appears in the options dialog.
@@ -20,8 +25,12 @@ class Player(Playerlibrary):
         The color that the player plays as described in "board.py".
 
     """
+    rules = None
+
     def __init__(self, color):
         self.color = color
+        if self.rules is not None:
+            self.engine = RuleEngine(self.rules)
 
     def make_move(self, gui):
         """
@@ -49,8 +58,35 @@ class Player(Playerlibrary):
             raise InvalidMoveError('Player "%s" did not place a stone.' % self.name)
 
     def _make_move(self, gui):
-        "Override this function for specific players"
-        raise NotImplementedError
+        "Place the stone chosen by ``choose_move``; override this function for players that need the gui"
+        gui.board[self.choose_move(gui.board)] = self.color
+
+    def choose_move(self, board):
+        """
+        Return the position ``(y,x)`` where the player places the next
+        stone on `board`. The `board` is not changed.
+        Override this function for specific players that do not define
+        ``rules``.
+
+        :param board:
+
+            The game ``Board`` as described in "board.py"
+
+        """
+        if self.rules is None:
+            raise NotImplementedError
+        return self.engine.choose_move(self, board)
+
+    def rank_moves(self, board):
+        """
+        Return a list of positions ``(y,x)`` that the player considers
+        playing on `board`, the most preferred first. The first entry is
+        the move returned by ``choose_move``.
+
+        """
+        if self.rules is None:
+            return [self.choose_move(board)]
+        return self.engine.rank_moves(self, board)
 
 
 # Human player
@@ -76,6 +112,7 @@ class Human(Player):
 
 # search for player types in all files of this folder
 available_player_types = [Human]
+library_modules = ['__init__.py', 'lib.py', 'analysis.py', 'threatmap.py', 'engine.py', 'solver.py', 'parallel.py'] # do not hold player types
 from os import listdir, path
 player_directory = path.split(__file__)[0]
 print('Searching for players in', player_directory)
@@ -83,7 +120,7 @@ filenames = listdir(player_directory)
 filenames.sort() # search in alphabetical order
 for filename in filenames:
     if filename[-3:] != '.py' or 'test' in filename or \
-       filename == '__init__.py' or filename == 'lib.py':
+       filename in library_modules:
            continue
     print('Processing', filename)
     exec('from . import ' + filename[:-3] + ' as playerlib')
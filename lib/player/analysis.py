@@ -0,0 +1,348 @@
+"Analysis of the lines on a game board shared by all rules of the AI players"
+
+from ..board import black, white, empty, directions as board_directions, map_tiles, join_tiles
+import numpy as np
+
+class PatternTable(object):
+    """
+    Lookup table of the patterns of lines of `length` positions in a
+    game won with `win_length` stones in a line.
+    A line is encoded as the base-3 integer ``sum(digit[k] * 3**k)``
+    where ``digit[k]`` is 0 for an empty position, 1 for a stone of the
+    color the pattern refers to ("own") and 2 for a stone of the
+    opposite color.
+    For every pattern ``name`` the table holds ``match[name]``, a boolean
+    array indicating which of the ``3**length`` codes show the pattern, and
+    ``targets[name]``, an integer array of the shape (``3**length``,
+    number of targets) with the indices of the positions in the line
+    where a stone should be placed (padded with -1).
+    Do not create instances yourself but use ``get_pattern_table``.
+
+    """
+    def __init__(self, length, win_length=5):
+        self.length = length
+        self.win_length = win_length
+        self.powers = 3 ** np.arange(length)
+        codes = np.arange(3 ** length)
+        self.digits = (codes[:,None] // self.powers) % 3
+        self.own_stones = (self.digits == 1).sum(axis=1)
+        self.empty_positions = (self.digits == 0).sum(axis=1)
+        self.match = {}
+        self.targets = {}
+        self._combined_match = {}
+        define_patterns(self)
+
+    def add_pattern(self, name, match, targets=None):
+        """
+        Add the pattern `name` to the table.
+
+        :param match:
+
+            boolean array; indicates for every code if it shows the pattern.
+
+        :param targets:
+
+            integer array of the shape (``3**length``,) or (``3**length``,
+            number of targets), optional; the positions to place a stone.
+
+        """
+        if targets is None:
+            targets = -1
+        targets = np.asarray(targets)
+        if targets.ndim == 0:
+            targets = np.full(len(match), targets)
+        targets = np.where(match[:,None], targets.reshape(len(match), -1), -1)
+        self.match[name] = match
+        self.targets[name] = targets
+
+    def encode(self, lines, color):
+        "Return the codes of the `lines` (as in ``board.board``) seen by `color`"
+        digits = (lines == color) + 2 * (lines == -color)
+        return digits.dot(self.powers)
+
+    def combined_match(self, patterns):
+        """
+        Return a boolean array of the shape (``3**length``, number of
+        `patterns`); column ``i`` is ``match[patterns[i]]``.
+
+        """
+        patterns = tuple(patterns)
+        if patterns not in self._combined_match:
+            self._combined_match[patterns] = np.column_stack([self.match[name] for name in patterns])
+        return self._combined_match[patterns]
+
+    def nth_digit(self, value, n=0):
+        "Return the index of the `n`-th position holding `value` in each code"
+        return np.argsort(self.digits != value, axis=1, kind='mergesort')[:,n]
+
+def define_patterns(table):
+    """
+    Add the patterns used by the rules in ``Playerlibrary`` to the `table`.
+    The patterns are named after the usual five in a row; e.g. a "four"
+    is a line that lacks one stone to win and a "three" lacks two.
+
+    """
+    digits, length, win_length = table.digits, table.length, table.win_length
+    # the number of own stones in a "four", "three" and "two"
+    four, three, two = win_length - 1, max(win_length - 2, 1), max(win_length - 3, 1)
+    own_stones, empty_positions = table.own_stones, table.empty_positions
+    pure = own_stones + empty_positions == length # no stone of the opposite color
+    first_own = table.nth_digit(1)
+    first_empty, second_empty = table.nth_digit(0), table.nth_digit(0, 1)
+    # the positions of own stones are connected if the first and the last are close enough
+    last_own = length - 1 - np.argmax(digits[:,::-1] == 1, axis=1)
+    connected = last_own - first_own == own_stones - 1
+    left_of_first_own = np.where(first_own == 0, win_length - 2, first_own - 1)
+
+    # one stone missing; the empty position completes the line
+    table.add_pattern('four', pure & (own_stones == four), first_empty)
+    # two stones missing; extend next to the stones
+    table.add_pattern('three', pure & (own_stones == three), np.where(first_empty == 0, second_empty, first_empty))
+    table.add_pattern('connected three', pure & (own_stones == three) & connected, left_of_first_own)
+    # three stones missing; any of the first three empty positions extends to
+    # a three (-1 where a short line has fewer empty positions)
+    first_three_empty = np.argsort(digits != 0, axis=1, kind='mergesort')[:,:3]
+    table.add_pattern('two', pure & (own_stones == two),
+                      np.where(digits[np.arange(len(digits))[:,None], first_three_empty] == 0, first_three_empty, -1))
+    table.add_pattern('connected two', pure & (own_stones == two) & connected, left_of_first_own)
+    table.add_pattern('two or more', pure & (own_stones >= two))
+    # one own stone; extend next to the stone
+    table.add_pattern('one', pure & (own_stones == 1), np.where(first_own == 0, 1, first_own - 1))
+
+    def shows(digit_pattern):
+        "Return the codes equal to `digit_pattern`; none if it does not fit into the line"
+        if len(digit_pattern) != length:
+            return np.zeros(len(digits), dtype=bool)
+        return (digits == digit_pattern).all(axis=1)
+
+    if length == win_length:
+        # [<all empty>, own, own, own, <all empty>]
+        table.add_pattern('doubly open three', shows([0] + [1] * three + [0]), 0)
+        # [<all empty>, own, own, <all empty>] with two empty positions on one side
+        left = shows([0] + [1] * two + [0, 0])
+        right = shows([0, 0] + [1] * two + [0])
+        table.add_pattern('doubly open two', left | right, np.where(left, win_length - 2, 1))
+
+    elif length == win_length + 1:
+        # [empty, <extendable to 4 times own>, empty]
+        table.add_pattern('open three', pure & (own_stones == three) & (digits[:,0] == 0) & (digits[:,-1] == 0), second_empty)
+        # [empty, <extendable to 3 times own>, empty]
+        table.add_pattern('open two', pure & (own_stones == two) & (digits[:,0] == 0) & (digits[:,-1] == 0), second_empty)
+
+_pattern_tables = {}
+def get_pattern_table(length, win_length=5):
+    "Return the (cached) ``PatternTable`` of lines of `length` in a game won with `win_length` in a line"
+    key = (length, win_length)
+    if key not in _pattern_tables:
+        _pattern_tables[key] = PatternTable(length, win_length)
+    return _pattern_tables[key]
+
+class IncrementalAnalysis(object):
+    """
+    Base class of an analysis of the position on a board that follows the
+    game: ``update`` consumes the moves by which ``board.log`` differs from
+    the moves seen so far instead of analysing the whole board again.
+    Subclasses set up the analysis of the `board` in ``__init__``, call
+    ``IncrementalAnalysis.__init__`` and implement ``_update_stone``.
+
+    :param board:
+
+        The game ``Board`` as described in "board.py".
+
+    """
+    # ``update`` always replays up to this many changed moves, even if
+    # there are fewer moves in the log (e.g. in a search from a copied
+    # position); replaying a few moves is much cheaper than rebuilding
+    min_update_changes = 16
+
+    def __init__(self, board):
+        self.shape = board.shape
+        self.win_length = board.win_length
+        self.zobrist_keys = board.zobrist_keys
+        self.hash = board.hash
+        self.moves_left = board.moves_left
+        self.log = list(board.log)
+        self.colors = [int(board[key]) for key in self.log]
+
+    def describes(self, board):
+        "Return bool that indicates if the analysis is valid for the position on `board`"
+        return self.shape == board.shape and self.win_length == board.win_length and \
+               self.hash == board.hash and self.moves_left == board.moves_left
+
+    def update(self, board):
+        """
+        Bring the analysis up to date with the position on `board`: take
+        back the moves that are no longer in ``board.log`` and add the new
+        ones.
+        Return ``False`` if the position cannot be reached that way (e.g.
+        on another board) or if more moves change than there are in the
+        log and more than ``min_update_changes`` (e.g. after
+        ``Board.reset``); the analysis is invalid then and has to be
+        rebuilt.
+
+        """
+        if self.shape != board.shape or self.win_length != board.win_length:
+            return False
+        log = board.log
+        common = len(self.log)
+        if log[:common] != self.log:
+            common = 0
+            for old_key, new_key in zip(self.log, log):
+                if old_key != new_key:
+                    break
+                common += 1
+        if len(self.log) + len(log) - 2 * common > max(len(log), self.min_update_changes):
+            return False
+        for key, color in reversed(list(zip(self.log[common:], self.colors[common:]))):
+            self._change_stone(key, color, -1)
+        del self.log[common:]
+        del self.colors[common:]
+        for key in log[common:]:
+            color = int(board[key])
+            self._change_stone(key, color, +1)
+            self.log.append(key)
+            self.colors.append(color)
+        self.moves_left = board.moves_left
+        return self.hash == board.hash
+
+    def _change_stone(self, key, color, change):
+        height, width = self.shape
+        y, x = key
+        y %= height
+        x %= width
+        self.hash ^= int(self.zobrist_keys[0 if color == black else 1, y * width + x])
+        self._update_stone(y, x, color, change)
+
+    def _update_stone(self, y, x, color, change):
+        "Override this function to add (`change` = +1) or remove (-1) a stone"
+        raise NotImplementedError
+
+class ThreatReport(IncrementalAnalysis):
+    """
+    Classification of all lines of the win length and the win length plus
+    one on the `board` for both colors.
+    The lines are encoded as base-3 integers with one dot product per
+    color and classified by a lookup in the ``PatternTable``. On large
+    boards the lines are encoded and searched in tiles on a pool of
+    threads (see ``map_tiles`` in "board.py"); the results are merged in
+    line order. When a stone is placed or taken back only the codes of the lines through
+    that position change (see ``IncrementalAnalysis.update``).
+    Check with ``describes`` (or call ``update``) before reusing a
+    report.
+
+    :param board:
+
+        The game ``Board`` as described in "board.py".
+
+    """
+    def __init__(self, board):
+        super(ThreatReport, self).__init__(board)
+        self.lengths = (self.win_length, self.win_length + 1)
+        self.pattern_tables = {}
+        self.tables = {}
+        self.codes = {}
+        flat_board = board.board.ravel()
+        for length in self.lengths:
+            table = self.tables[length] = board.get_line_table(length)
+            pattern_table = self.pattern_tables[length] = get_pattern_table(length, self.win_length)
+            def encode_tile(tile):
+                contents = flat_board[table.indices[tile]]
+                return [pattern_table.encode(contents, color) for color in (black, white)]
+            codes = map_tiles(encode_tile, table.tiles)
+            for i, color in enumerate((black, white)):
+                self.codes[length, color] = join_tiles([tile_codes[i] for tile_codes in codes])
+
+    def _update_stone(self, y, x, color, change):
+        for length in self.lengths:
+            table = self.tables[length]
+            lines = table.lines_through(y, x)
+            powers = self.pattern_tables[length].powers[table.positions_through(y, x)]
+            self.codes[length, color][lines] += change * powers
+            self.codes[length, -color][lines] += 2 * change * powers
+
+    def find(self, pattern, color, length=None):
+        """
+        Return the indices (into the ``LineTable`` of `length`) of all
+        lines of `length` (by default the win length) that show the
+        `pattern` for `color` and the positions in these lines where to
+        place a stone (see ``PatternTable``), ordered by index.
+
+        """
+        length = length or self.win_length
+        pattern_table = self.pattern_tables[length]
+        match = pattern_table.match[pattern]
+        codes = self.codes[length, color]
+        tiles = self.tables[length].tiles
+        if len(tiles) == 1:
+            matching = np.flatnonzero(match[codes])
+        else:
+            matching = np.concatenate(map_tiles(lambda tile: tile.start + np.flatnonzero(match[codes[tile]]), tiles))
+        return matching, pattern_table.targets[pattern][codes[matching]]
+
+    def find_first(self, patterns, color, length=None):
+        """
+        Return the index of the first line of `length` that shows the
+        pattern for `color` for each of the `patterns` (-1 if there is no
+        such line). All `patterns` are looked up in one pass over the
+        lines.
+
+        """
+        length = length or self.win_length
+        combined_match = self.pattern_tables[length].combined_match(patterns)
+        codes = self.codes[length, color]
+        def find_first_in_tile(tile):
+            matches = combined_match[codes[tile]]
+            if not len(matches):
+                # no lines of `length` fit onto the board
+                return np.full(len(patterns), -1)
+            return np.where(matches.any(axis=0), matches.argmax(axis=0) + tile.start, -1)
+        first_lines = map_tiles(find_first_in_tile, self.tables[length].tiles)
+        if len(first_lines) == 1:
+            return first_lines[0]
+        # the first line of the first tile showing the pattern
+        first_lines = np.array(first_lines)
+        found = first_lines >= 0
+        return np.where(found.any(axis=0), first_lines[found.argmax(axis=0), np.arange(len(patterns))], -1)
+
+    def target(self, pattern, color, line, length=None):
+        "Return the position where the `line` of `length` showing the `pattern` for `color` should be extended"
+        length = length or self.win_length
+        code = self.codes[length, color][line]
+        return self.positions(line, length)[self.pattern_tables[length].targets[pattern][code, 0]]
+
+    def positions(self, line, length=None):
+        "Return the coordinates of the `line`-th line of `length` (by default the win length)"
+        return self.tables[length or self.win_length].positions(line)
+
+    def directions(self, lines, length=None):
+        "Return the directions of the `lines` of `length` (by default the win length)"
+        return self.tables[length or self.win_length].directions[lines]
+
+    def find_crossing(self, lines, board, length=None):
+        """
+        Return the position ``(y,x)`` where the first of the `lines`
+        crosses an earlier one of the `lines` of a different direction at
+        an empty position of `board`, or None.
+        If there are several such earlier lines the earliest one is used;
+        two lines of different directions cross at one position at most.
+
+        """
+        table = self.tables[length or self.win_length]
+        number_of_lines = len(lines)
+        ranks = np.arange(number_of_lines)
+        indices = table.indices[lines]
+        directions = table.directions[lines]
+        # inverted index: the first line through each position per direction
+        first_line = np.full((board.height * board.width, len(board_directions)), number_of_lines)
+        np.minimum.at(first_line, (indices, directions[:,None]), ranks[:,None])
+        # the first line of another direction through each position of each line
+        crossing_lines = first_line[indices]
+        crossing_lines[ranks, :, directions] = number_of_lines
+        crossing_lines = crossing_lines.min(axis=2)
+        crossing_lines[(crossing_lines >= ranks[:,None]) | (board.board.ravel()[indices] != empty)] = number_of_lines
+        crossed = np.flatnonzero(crossing_lines.min(axis=1) < number_of_lines)
+        if not len(crossed):
+            return None
+        line = crossed[0]
+        position = np.argmin(crossing_lines[line])
+        return int(table.ys[lines[line], position]), int(table.xs[lines[line], position])
@@ -0,0 +1,74 @@
+from . import Player
+import numpy as np
+
+class Scoring(Player):
+    """
+    Score every empty position at once and play the best one.
+    The score of a position is the weighted number of lines (windows of
+    the win length) through it that can still be completed, counted in
+    all four directions; the weights depend on the number of stones in
+    the line (see ``own_weights`` and ``opponent_weights``). All lines of
+    both colors are evaluated by a few cumulative sums over the board
+    (see ``ThreatMap.weighted_lines``).
+
+    :param color:
+
+        The color that the player plays as described in "board.py".
+
+    """
+    name = 'Scoring'
+    # weights of a line through an empty position by the number of stones
+    # missing in the line (one, two, ...; lines missing more stones get the
+    # last weight); completing an own line beats blocking the opponent's
+    own_weights      = (1000000, 2500, 150, 30, 1)
+    opponent_weights = (100000, 1800, 120, 10, 1)
+
+    def line_weights(self, weights, win_length):
+        """
+        Return the `weights` (by the number of missing stones) as an array
+        indexed by the number of stones in a line of `win_length`.
+
+        """
+        missing = np.clip(win_length - np.arange(win_length + 1) - 1, 0, len(weights) - 1)
+        return np.asarray(weights)[missing]
+
+    def score_moves(self, board, color=None):
+        """
+        Return an array of the shape of `board` holding the score of each
+        position for `color` (by default the player's color) to move;
+        occupied positions score ``-inf``.
+
+        """
+        if color is None:
+            color = self.color
+        threat_map = self.get_threat_map(board)
+        scores = threat_map.weighted_lines(color, self.line_weights(self.own_weights, board.win_length)) + \
+                 threat_map.weighted_lines(-color, self.line_weights(self.opponent_weights, board.win_length))
+        return np.where(threat_map.empty, scores, -np.inf)
+
+    def best_moves(self, board, color, number):
+        """
+        Return at most `number` positions ``(y,x)`` with the highest scores
+        for `color` to move, best first, among the candidate moves of
+        `board` (the empty positions next to a stone, see
+        ``Board.candidate_cells``; all empty positions on an empty board).
+        Equal scores keep the row-major order.
+
+        """
+        cells = board.candidate_cells()
+        if not len(cells):
+            cells = board.empty_positions()
+        cells = np.sort(cells)
+        scores = self.score_moves(board, color).ravel()[cells]
+        order = np.argsort(-scores, kind='mergesort')[:number]
+        return [divmod(int(cell), board.width) for cell in cells[order]]
+
+    def choose_move(self, board):
+        # the first position (row by row) with the highest score
+        return divmod(int(np.argmax(self.score_moves(board))), board.width)
+
+    def rank_moves(self, board):
+        scores = self.score_moves(board).ravel()
+        order = np.argsort(-scores, kind='mergesort')
+        order = order[np.isfinite(scores[order])]
+        return [divmod(int(cell), board.width) for cell in order]
@@ -0,0 +1,80 @@
+"Execute the priority lists of rules of the heuristic players"
+
+from collections import defaultdict
+
+class RuleEngine(object):
+    """
+    Choose moves according to a list of `rules` ordered by priority. The
+    rules are referred to by name; the rule ``name`` of a player is the
+    method ``find_<name>`` (see ``Playerlibrary``).
+    All rules listed in ``Playerlibrary.pattern_rules`` are evaluated in
+    one pass over the lines of the board before walking down the list;
+    the other rules are only called if no rule of higher priority found a
+    move.
+    The engine counts how often each rule decided the move in ``hits``
+    and the number of chosen moves in ``calls``.
+
+    :param rules:
+
+        sequence of strings; the names of the rules, highest priority
+        first.
+
+    """
+    def __init__(self, rules):
+        self.rules = tuple(rules)
+        self.reset_statistics()
+
+    def reset_statistics(self):
+        self.calls = 0
+        self.hits = dict((rule, 0) for rule in self.rules)
+
+    def hit_rates(self):
+        "Return a dict with the fraction of the chosen moves decided by each rule"
+        return dict((rule, float(hits) / self.calls if self.calls else 0.) for rule, hits in self.hits.items())
+
+    def scan(self, player, board):
+        """
+        Return a dict with the position found by every rule listed in
+        ``player.pattern_rules`` (None if the rule does not apply).
+
+        """
+        report = player.get_threat_report(board)
+        # group the patterns by the color and the length of the lines
+        groups = defaultdict(list)
+        for rule in self.rules:
+            if rule in player.pattern_rules:
+                pattern, relative_color, extra_length = player.pattern_rules[rule]
+                groups[relative_color * player.color, board.win_length + extra_length].append((rule, pattern))
+        found = {}
+        for (color, length), rules in groups.items():
+            first_lines = report.find_first([pattern for rule, pattern in rules], color, length)
+            for (rule, pattern), line in zip(rules, first_lines):
+                found[rule] = None if line < 0 else report.target(pattern, color, line, length)
+        return found
+
+    def proposals(self, player, board):
+        "Iterate over the pairs (rule, position) of the rules that apply in the order of priority"
+        found = self.scan(player, board)
+        for rule in self.rules:
+            if rule in found:
+                pos = found[rule]
+            else:
+                pos = getattr(player, 'find_' + rule)(board)
+            if pos is not None:
+                yield rule, pos
+
+    def choose_move(self, player, board):
+        "Return the position found by the rule with the highest priority that applies"
+        for rule, pos in self.proposals(player, board):
+            self.calls += 1
+            self.hits[rule] += 1
+            return pos
+
+    def rank_moves(self, player, board):
+        "Return the list of the distinct positions found by all rules in the order of priority"
+        moves = []
+        for rule, pos in self.proposals(player, board):
+            pos = tuple(int(i) for i in pos)
+            if pos not in moves:
+                moves.append(pos)
+        return moves
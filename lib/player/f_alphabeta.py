@@ -0,0 +1,319 @@
+from ..board import Board, black
+from ..transposition import TranspositionTable, exact, lower_bound, upper_bound
+from .e_scoring import Scoring
+from . import parallel
+import numpy as np
+import time
+
+class SearchTimeout(Exception):
+    "Raised inside the search when the time budget of the move is used up"
+    pass
+
+class AlphaBeta(Scoring):
+    """
+    Negamax search with alpha-beta pruning and iterative deepening.
+    The search deepens one ply at a time until the `time_budget` (in
+    seconds) of the move is used up or ``max_depth`` is reached and plays
+    the best move of the deepest completed iteration; an iteration that
+    runs out of time is discarded.
+    The candidate moves of a position come from the threat detections of
+    the ``Playerlibrary`` (see ``threat_rules``): an own four is played
+    at once, an opposing four must be blocked and otherwise the targets
+    of the threat patterns are searched first, followed by the best
+    positions next to the stones (see ``Scoring.best_moves``); at most
+    ``max_candidates`` moves are searched per position.
+    The leaves are evaluated from the line counts of the board (see
+    ``evaluate``) once no four is left on the board (see ``quiesce``).
+    The results of the searched positions are kept in a
+    ``TranspositionTable`` of ``table_memory`` bytes for the whole game
+    (see ``table_key``); positions reached again by a different move
+    order are not searched again and the best move stored for a position
+    is searched first. The table is cleared when the shape or the win
+    length of the board changes.
+    With more than one of `processes` the root moves are split among
+    that many processes that search at the same time (see
+    "parallel.py"); every part is searched with a new table.
+
+    :param color:
+
+        The color that the player plays as described in "board.py".
+
+    :param time_budget:
+
+        float, optional; the number of seconds to think per move.
+
+    :param processes:
+
+        integer, optional; the number of processes that search the root
+        moves (1 searches in this process).
+
+    """
+    name = 'Alpha-beta'
+    time_budget = 1.
+    max_depth = 10
+    max_candidates = 8
+    table_memory = 2**24
+    processes = 1
+    # the attributes copied to the processes of a root-parallel search
+    search_settings = ('time_budget', 'max_depth', 'max_candidates')
+    # the rules of the ``Playerlibrary`` whose targets are searched first,
+    # in this order
+    threat_rules = ('win_if_possible',
+                    'block_open_four',
+                    'extend_three_to_doubly_open_four',
+                    'block_to_doubly_open_four',
+                    'extend_three_to_four',
+                    'block_open_three')
+    # larger than the score of any position that is not won
+    win_score = 10 ** 12
+    # mixed into the key of a position in the table if black is in turn
+    black_in_turn_key = 0x9e3779b97f4a7c15
+
+    def __init__(self, color, time_budget=None, processes=None):
+        super(AlphaBeta, self).__init__(color)
+        if time_budget is not None:
+            self.time_budget = time_budget
+        if processes is not None:
+            self.processes = processes
+        self.nodes = 0
+        self.depth = 0
+        self.table = TranspositionTable(self.table_memory)
+
+    def evaluate(self, board):
+        """
+        Return the static score of the position on `board` for the color in
+        turn: the weighted number of lines that can still be completed by
+        the color in turn (``own_weights``) minus those of the opponent
+        (``opponent_weights``), read from the line counts of the board.
+
+        """
+        color = board.in_turn
+        counts = board.line_counts[board.win_length]
+        own, opposing = counts[color], counts[-color]
+        own_weights = self.line_weights(self.own_weights, board.win_length)
+        opponent_weights = self.line_weights(self.opponent_weights, board.win_length)
+        return int(own_weights[own[opposing == 0]].sum()) - int(opponent_weights[opposing[own == 0]].sum())
+
+    def candidates(self, board):
+        """
+        Return the list of the moves to search in the position on `board`
+        for the color in turn, the most promising first.
+
+        """
+        color = board.in_turn
+        report = self.get_threat_report(board)
+        threats = []
+        for rule in self.threat_rules:
+            pattern, relative_color, extra_length = self.pattern_rules[rule]
+            length = board.win_length + extra_length
+            lines, targets = report.find(pattern, relative_color * color, length)
+            positions = [report.positions(line, length)[target] for line, target in zip(lines, targets[:,0])]
+            if rule == 'win_if_possible' and positions:
+                return positions[:1]
+            for position in positions:
+                if position not in threats:
+                    threats.append(position)
+            if rule == 'block_open_four' and threats:
+                # the opposing fours have to be blocked
+                return threats
+
+        moves = threats[:self.max_candidates]
+        for position in self.best_moves(board, color, 2 * self.max_candidates):
+            if len(moves) == self.max_candidates:
+                break
+            if position not in moves:
+                moves.append(position)
+        return moves
+
+    def quiesce(self, board, ply):
+        """
+        Return the score of the leaf position on `board` for the color in
+        turn: a four of the color in turn wins, two fours of the opponent
+        lose and a single one is blocked before the position is evaluated
+        by ``evaluate``; the static evaluation cannot tell who wins a race
+        of fours.
+
+        """
+        color = board.in_turn
+        if board.winning_moves(color):
+            return self.win_score - ply - 1
+        opposing_fours = board.winning_moves(-color)
+        if not opposing_fours:
+            return self.evaluate(board)
+        if len(opposing_fours) > 1:
+            return -(self.win_score - ply - 2)
+        board[opposing_fours[0]] = color
+        try:
+            return -self.quiesce(board, ply + 1)
+        finally:
+            board.undo()
+
+    def is_win(self, score):
+        "Return bool that indicates if `score` is a win or a loss"
+        # no evaluation comes close to half of ``win_score``
+        return abs(score) >= self.win_score // 2
+
+    def shift_win(self, score, plies):
+        """
+        Return `score` with wins and losses moved by `plies` plies closer;
+        wins are stored in the ``table`` counted from the stored position
+        rather than from the root of the search.
+
+        """
+        if not self.is_win(score):
+            return score
+        return score + plies if score > 0 else score - plies
+
+    def table_key(self, board):
+        "Return the key of the position on `board` in the ``table``: the ``hash`` mixed with the color in turn"
+        if board.in_turn == black:
+            return board.hash ^ self.black_in_turn_key
+        return board.hash
+
+    def negamax(self, board, depth, alpha, beta, ply):
+        """
+        Return the score of the position on `board` for the color in turn
+        searched `depth` plies deep within the window (`alpha`, `beta`).
+        Wins score ``win_score`` less the number of plies to the win.
+
+        """
+        self.nodes += 1
+        if time.time() > self.deadline:
+            raise SearchTimeout
+        if board.winner()[0] is not None:
+            # the previous move won
+            return -(self.win_score - ply)
+        if board.full():
+            return 0
+        if depth == 0:
+            return self.quiesce(board, ply)
+
+        # look up the table before generating the moves, which costs most
+        key = self.table_key(board)
+        entry = self.table.probe(key)
+        if entry is not None:
+            score = self.shift_win(entry.score, -ply)
+            if entry.depth >= depth and (entry.bound == exact or
+                                         entry.bound == lower_bound and score >= beta or
+                                         entry.bound == upper_bound and score <= alpha):
+                return score
+        moves = self.candidates(board)
+        if entry is not None and entry.move in moves:
+            moves.remove(entry.move)
+            moves.insert(0, entry.move)
+
+        original_alpha = alpha
+        best, best_move = -self.win_score, None
+        for move in moves:
+            board[move] = board.in_turn
+            try:
+                score = -self.negamax(board, depth - 1, -beta, -alpha, ply + 1)
+            finally:
+                board.undo()
+            if score > best:
+                best, best_move = score, move
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+
+        if best <= original_alpha:
+            bound = upper_bound
+        elif best >= beta:
+            bound = lower_bound
+        else:
+            bound = exact
+        self.table.store(key, depth, bound, self.shift_win(best, ply), best_move)
+        return best
+
+    def search(self, board, moves=None):
+        """
+        Return the moves at the root of the position on `board` ordered by
+        the scores of the deepest completed iteration, best first.
+        The search works on a copy of `board`. ``iteration_scores`` holds
+        the scores of the root moves of every completed iteration.
+
+        :param moves:
+
+            list, optional; the root moves to search (by default the
+            ``candidates`` of the position).
+
+        """
+        self.deadline = time.time() + self.time_budget
+        self.nodes = 0
+        self.depth = 0
+        self.iteration_scores = []
+        board = Board.from_bytes(board.to_bytes())
+        if getattr(self, 'table_board', None) != (board.shape, board.win_length):
+            self.table_board = (board.shape, board.win_length)
+            self.table.clear()
+        self.table.new_search()
+        if moves is None:
+            moves = self.candidates(board)
+            if len(moves) < 2:
+                return moves
+        else:
+            # the moves of a part of a root-parallel search are scored even
+            # if there is only one
+            moves = list(moves)
+        for depth in range(1, self.max_depth + 1):
+            scores = {}
+            alpha = -self.win_score - 1
+            try:
+                for move in moves:
+                    board[move] = board.in_turn
+                    try:
+                        scores[move] = -self.negamax(board, depth - 1, -self.win_score - 1, -alpha, 1)
+                    finally:
+                        board.undo()
+                    alpha = max(alpha, scores[move])
+            except SearchTimeout:
+                break
+            # search the best moves first in the next iteration; the sort
+            # is stable such that ties keep the order of ``candidates``
+            moves.sort(key=lambda move: -scores[move])
+            self.depth = depth
+            self.iteration_scores.append(scores)
+            if self.is_win(scores[moves[0]]):
+                break
+        return moves
+
+    def search_part(self, board, moves):
+        "Search the root `moves` on `board` in a process of a root-parallel search; return ``iteration_scores``"
+        self.search(board, moves)
+        return self.iteration_scores
+
+    def parallel_search(self, board):
+        """
+        Return the moves at the root of the position on `board` like
+        ``search`` but split them among ``processes`` processes; the
+        moves are ordered by their scores of the deepest iteration that
+        all processes completed.
+        There are no more parts than processes in the pool (see
+        ``parallel.get_number_of_processes``) such that all parts run at
+        the same time within the ``time_budget``.
+
+        """
+        moves = self.candidates(board)
+        number_of_parts = min(self.processes, parallel.get_number_of_processes(), len(moves))
+        if number_of_parts < 2:
+            return self.search(board)
+        # deal the moves such that every part gets some of the most promising
+        parts = [moves[part::number_of_parts] for part in range(number_of_parts)]
+        results = parallel.map_search(self, board, parts)
+        self.depth = min(len(iteration_scores) for iteration_scores in results)
+        if not self.depth:
+            return moves
+        scores = {}
+        for iteration_scores in results:
+            scores.update(iteration_scores[self.depth - 1])
+        moves.sort(key=lambda move: -scores[move])
+        return moves
+
+    def choose_move(self, board):
+        return self.rank_moves(board)[0]
+
+    def rank_moves(self, board):
+        if self.processes > 1:
+            return self.parallel_search(board)
+        return self.search(board)
@@ -0,0 +1,248 @@
+from ..board import Board, empty
+from .e_scoring import Scoring
+from . import parallel
+import numpy as np
+import math
+import time
+
+class Node(object):
+    """
+    A position in the search tree of ``MonteCarlo``, reached by placing a
+    stone of `color` at `move` in the position of the `parent`.
+    ``visits`` counts the playouts through the node and ``wins`` the
+    playouts won by `color` (draws count one half). ``result`` is the
+    winner if the game is over in the node (``empty`` for a draw) and
+    None otherwise. ``untried`` holds the moves without a child yet, the
+    most promising last.
+
+    """
+    __slots__ = ('move', 'color', 'parent', 'hash', 'children', 'untried', 'visits', 'wins', 'result')
+
+    def __init__(self, move, color, parent, board):
+        self.move = move
+        self.color = color
+        self.parent = parent
+        self.hash = board.hash
+        self.children = []
+        self.untried = []
+        self.visits = 0
+        self.wins = 0.
+        self.result = board.winner()[0]
+        if self.result is None and board.full():
+            self.result = empty
+
+class MonteCarlo(Scoring):
+    """
+    Monte Carlo tree search with UCT selection.
+    Every playout descends the tree by the UCB1 formula (see
+    ``exploration``), adds one node and finishes the game from there by a
+    cheap rollout policy (see ``rollout_move``) on the search board, whose
+    moves are taken back afterwards. The search runs until the
+    `time_budget` (in seconds) of the move is used up (or ``max_playouts``
+    are done) and plays the most visited move.
+    The moves of a new node are the best ``max_children`` positions next
+    to the stones (see ``Scoring.best_moves``); if the player in turn can
+    win or has to block an opposing four, only these moves are searched.
+    The tree is kept between the moves of a game: if the position of the
+    next call is in the tree (usually two plies below the last root), the
+    search continues from there.
+    ``playouts`` and ``playouts_per_second`` describe the last search.
+    With more than one of `processes` that many processes search
+    independent trees at the same time (see "parallel.py") and the
+    visits of the root moves are added up.
+
+    :param color:
+
+        The color that the player plays as described in "board.py".
+
+    :param time_budget:
+
+        float, optional; the number of seconds to think per move.
+
+    :param processes:
+
+        integer, optional; the number of processes that search trees (1
+        searches in this process).
+
+    """
+    name = 'Monte Carlo'
+    time_budget = 1.
+    max_playouts = None
+    max_children = 12
+    # the weight of the exploration term of UCB1
+    exploration = .7
+    # rollouts that last longer count as a draw
+    max_rollout_moves = 60
+    processes = 1
+    # the attributes copied to the processes of a root-parallel search
+    search_settings = ('time_budget', 'max_playouts', 'max_children', 'exploration', 'max_rollout_moves')
+
+    def __init__(self, color, time_budget=None, processes=None):
+        super(MonteCarlo, self).__init__(color)
+        if time_budget is not None:
+            self.time_budget = time_budget
+        if processes is not None:
+            self.processes = processes
+        self.root = None
+        self.playouts = 0
+        self.playouts_per_second = 0.
+
+    def forced_moves(self, board):
+        """
+        Return a list holding a position that completes a line of the
+        color in turn or, if there is none, the positions that block the
+        lines of the opponent; an empty list if neither exists.
+
+        """
+        moves = board.winning_moves(board.in_turn)
+        if moves:
+            return moves[:1]
+        return board.winning_moves(-board.in_turn)
+
+    def expand_moves(self, board):
+        "Return the moves of a new node in the position on `board`, the most promising last"
+        moves = self.forced_moves(board)
+        if moves:
+            return moves
+        return self.best_moves(board, board.in_turn, self.max_children)[::-1]
+
+    def rollout_move(self, board):
+        """
+        Return the move of the rollout policy on `board`: win if possible,
+        otherwise block an opposing four, otherwise a random empty
+        position next to the stones (see ``Board.random_candidate``).
+
+        """
+        moves = self.forced_moves(board)
+        if moves:
+            return moves[0]
+        return board.random_candidate()
+
+    def rollout(self, board):
+        "Finish the game on `board` by the rollout policy; return the winner (``empty`` for a draw)"
+        plies = 0
+        while board.winner()[0] is None and not board.full() and plies < self.max_rollout_moves:
+            board[self.rollout_move(board)] = board.in_turn
+            plies += 1
+        winner = board.winner()[0]
+        for i in range(plies):
+            board.undo()
+        return empty if winner is None else winner
+
+    def select(self, node):
+        "Return the child of `node` with the highest upper confidence bound (UCB1)"
+        log_visits = math.log(node.visits)
+        exploration = self.exploration
+        return max(node.children, key=lambda child: child.wins / child.visits +
+                   exploration * math.sqrt(log_visits / child.visits))
+
+    def add_child(self, node, move, board):
+        "Place a stone at `move` on `board` and return the new child of `node` for it"
+        color = board.in_turn
+        board[move] = color
+        child = Node(move, color, node, board)
+        if child.result is None:
+            child.untried = self.expand_moves(board)
+        node.children.append(child)
+        return child
+
+    def playout(self, board):
+        "Run one playout from the ``root`` (the position on `board`) and update the visited nodes"
+        node = self.root
+        plies = 0
+        while node.result is None and not node.untried:
+            node = self.select(node)
+            board[node.move] = board.in_turn
+            plies += 1
+        if node.result is None:
+            node = self.add_child(node, node.untried.pop(), board)
+            plies += 1
+        result = node.result
+        if result is None:
+            result = self.rollout(board)
+        for i in range(plies):
+            board.undo()
+
+        while node is not None:
+            node.visits += 1
+            if result == node.color:
+                node.wins += 1.
+            elif result == empty:
+                node.wins += .5
+            node = node.parent
+
+    def find_root(self, board):
+        """
+        Return the node of the position on `board` among the last root and
+        the two plies below it or a new node if it is not in the tree.
+
+        """
+        root = self.root
+        if root is not None and getattr(self, 'tree_board', None) == (board.shape, board.win_length):
+            for node in [root] + root.children + [grandchild for child in root.children for grandchild in child.children]:
+                if node.hash == board.hash and node.color == -board.in_turn:
+                    node.parent = None
+                    return node
+        self.tree_board = (board.shape, board.win_length)
+        root = Node(None, -board.in_turn, None, board)
+        root.untried = self.expand_moves(board)
+        return root
+
+    def search(self, board):
+        """
+        Search the position on `board` and return the children of the root
+        ordered by their visits, most visited first.
+        The search works on a copy of `board`.
+
+        """
+        start = time.time()
+        deadline = start + self.time_budget
+        board = Board.from_bytes(board.to_bytes())
+        self.root = self.find_root(board)
+        self.playouts = 0
+        while time.time() < deadline and self.playouts != self.max_playouts:
+            self.playout(board)
+            self.playouts += 1
+            if len(self.root.children) == 1 and not self.root.untried:
+                # a single move to win or to block
+                break
+        elapsed = time.time() - start
+        self.playouts_per_second = self.playouts / elapsed if elapsed > 0 else 0.
+        return sorted(self.root.children, key=lambda child: -child.visits)
+
+    def search_part(self, board, part):
+        "Search a tree in a process of a root-parallel search; return the visits of the root moves and the playouts"
+        return [(child.move, child.visits) for child in self.search(board)], self.playouts
+
+    def parallel_search(self, board):
+        """
+        Search ``processes`` independent trees of the position on `board`
+        at the same time and return the root moves ordered by the sum of
+        their visits, most visited first.
+        There are no more trees than processes in the pool (see
+        ``parallel.get_number_of_processes``) such that all trees are
+        searched at the same time within the ``time_budget``.
+
+        """
+        number_of_parts = min(self.processes, parallel.get_number_of_processes())
+        if number_of_parts < 2:
+            return [child.move for child in self.search(board)]
+        start = time.time()
+        seeds = np.random.randint(2**31, size=number_of_parts).tolist()
+        results = parallel.map_search(self, board, list(range(number_of_parts)), seeds)
+        visits = {}
+        for children, playouts in results:
+            for move, number in children:
+                visits[move] = visits.get(move, 0) + number
+        self.playouts = sum(playouts for children, playouts in results)
+        elapsed = time.time() - start
+        self.playouts_per_second = self.playouts / elapsed if elapsed > 0 else 0.
+        return sorted(visits, key=lambda move: (-visits[move], move))
+
+    def choose_move(self, board):
+        return self.rank_moves(board)[0]
+
+    def rank_moves(self, board):
+        if self.processes > 1:
+            return self.parallel_search(board)
+        return [child.move for child in self.search(board)]
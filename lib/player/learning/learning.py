@@ -1,4 +1,4 @@
-from .. import Player, InvalidMoveError
+from .. import Player
 from ..lib import black, white, empty
 from os import path
 import numpy as np
@@ -90,6 +90,26 @@ def remove_offset(oldlog, newlog):
 
 class Learning(Player):
     name = 'Adaptive'
+    rules = ('win_if_possible',
+             'block_open_four',
+             'extend_three_to_doubly_open_four',
+             'win_by_force',
+             'block_to_doubly_open_four',
+             'block_forced_win',
+             'block_doubly_open_three',
+             'stop_old_mistake',
+             'block_twice_to_three_or_more',
+             'extend_three_to_four',
+             'block_open_three',
+             'extend_twice_two_to_three',
+             'block_doubly_open_two',
+             'block_open_two',
+             'extend_two_to_three',
+             'play_center',
+             'play_below_center',
+             'extend_one',
+             'random_move')
+
     def __init__(self, *args, **kwargs):
         self.white_logfile = kwargs.pop('white_logfile', "white.log")
         self.black_logfile = kwargs.pop('black_logfile', "black.log")
@@ -104,30 +124,8 @@ class Learning(Player):
         self.oldlogs = load_oldlog(self.white_logfile) if self.color == white else load_oldlog(self.black_logfile)
 
     def _make_move(self, gui):
-        def place_stone():
-            if self.win_if_possible(gui): return True
-            if self.block_open_four(gui): return False
-            if self.extend_three_to_doubly_open_four(gui): return False
-            if self.block_to_doubly_open_four(gui): return False
-            if self.block_doubly_open_three(gui): return False
-            if self.stop_old_mistake(gui): return False
-            if self.block_twice_to_three_or_more(gui): return False
-            if self.extend_three_to_four(gui): return False
-            if self.block_open_three(gui): return False
-            if self.extend_twice_two_to_three(gui): return False
-            if self.block_doubly_open_two(gui): return False
-            if self.block_open_two(gui): return False
-            if self.extend_two_to_three(gui): return False
-            try:
-                gui.board[gui.board.height // 2, gui.board.width // 2] = self.color; return False
-            except InvalidMoveError:
-                try:
-                    gui.board[gui.board.height // 2 + 1, gui.board.width // 2] = self.color; return False
-                except InvalidMoveError:
-                    if self.extend_one(gui): return False
-                    self.random_move(gui)
-
-        winner_is_me = place_stone()
+        gui.board[self.choose_move(gui.board)] = self.color
+        winner_is_me = gui.board.winner()[0] == self.color
 
         if self.check_oldlogs and not winner_is_me:
             move_to_make_opponent_win = self.get_move_to_make_opponent_win(gui)
@@ -150,25 +148,31 @@ class Learning(Player):
         """
         opponent_color = -self.color
         opponent_dummy_player = Player(opponent_color)
-        return opponent_dummy_player.check_if_immediate_win_possible(gui)
+        return opponent_dummy_player.find_win_if_possible(gui.board)
 
-    def stop_old_mistake(self, gui):
+    def find_stop_old_mistake(self, board):
+        """
+        Return the position where the opponent placed a stone towards
+        winning in a previous game that started like the current one, or
+        None.
+
+        """
         if not self.check_oldlogs:
-            return False
+            return None
 
-        current_log = gui.board.log
+        current_log = board.log
 
         if not self.oldlogs or not current_log:
-            return False
+            return None
 
         for oldlog in self.oldlogs:
             if match_log(oldlog, current_log):
                 # Place stone where opponent would place
                 try:
-                    next_move = remove_offset(oldlog, current_log)
-                    gui.board[next_move] = self.color
-                    return True
+                    return remove_offset(oldlog, current_log)
                 except AssertionError:
                     continue
                 # raise NotImplementedError("The player 'Adaptive' is not ready to use yet. Choose a different player.")
-        return False
+
+    def stop_old_mistake(self, gui):
+        return self.place(gui, self.find_stop_old_mistake(gui.board))
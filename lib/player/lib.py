@@ -1,6 +1,9 @@
 "Define basic subroutines useful for all AI players"
 
-from ..board import black, white, empty, Board, InvalidMoveError
+from ..board import black, white, empty, Board
+from .analysis import ThreatReport
+from .threatmap import ThreatMap
+from .solver import ThreatSolver
 import numpy as np
 import unittest
 
@@ -10,284 +13,278 @@ class Playerlibrary(object):
     kinds of artificial-intelligence-type (AI-type) players, e.g. the
     function ``win_if_possible`` that checks if the game can be won in
     the next move.
-    All the functions are written to take the same arguments as
-    ``Player.make_move`` such that the call from within ``make_move``
-    looks like e.g. ``self.win_if_possible(gui)``.
+    Every rule comes in two forms: ``find_<rule>(board)`` returns the
+    position where the rule would place a stone (or None) without
+    changing the `board`; ``<rule>(gui)`` takes the same arguments as
+    ``Player.make_move``, places that stone onto ``gui.board`` and returns
+    whether it did so, e.g. ``self.win_if_possible(gui)``.
 
     """
-    def line_getter_functions(self, gui, length=5):
+    # the rules that play the target position of the first line showing a
+    # pattern (see ``PatternTable``): rule -> (pattern, color relative to
+    # the player (+1 own, -1 opponent), length of the lines relative to
+    # the win length of the board)
+    pattern_rules = {'win_if_possible': ('four', +1, 0),
+                     'block_open_four': ('four', -1, 0),
+                     'extend_three_to_doubly_open_four': ('open three', +1, 1),
+                     'block_to_doubly_open_four': ('open three', -1, 1),
+                     'block_doubly_open_three': ('doubly open three', -1, 0),
+                     'extend_three_to_four': ('three', +1, 0),
+                     'block_open_three': ('connected three', -1, 0),
+                     'block_doubly_open_two': ('doubly open two', -1, 0),
+                     'block_open_two': ('connected two', -1, 0),
+                     'extend_one': ('one', +1, 0)}
+
+    def line_getter_functions(self, gui, length=None):
         return [lambda x,y: gui.board.get_column(x,y,length=length), lambda x,y: gui.board.get_row(x,y, length=length),
                 lambda x,y: gui.board.get_diagonal_upleft_to_lowright(x,y, length=length),
                 lambda x,y: gui.board.get_diagonal_lowleft_to_upright(x,y, length=length)]
 
 
+    def get_threat_report(self, board):
+        """
+        Return the ``ThreatReport`` of the position on `board`.
+        The report is shared by all rules and kept by the player for the
+        whole game; it is updated with the moves played since the last
+        call and only rebuilt from scratch if that is not possible (e.g.
+        after ``Board.reset``).
+
+        """
+        report = getattr(self, '_threat_report', None)
+        if report is None or not report.update(board):
+            report = self._threat_report = ThreatReport(board)
+        return report
+
+    def get_threat_map(self, board):
+        "Return the ``ThreatMap`` of the position on `board` (updated like ``get_threat_report``)"
+        threat_map = getattr(self, '_threat_map', None)
+        if threat_map is None or not threat_map.update(board):
+            threat_map = self._threat_map = ThreatMap(board)
+        return threat_map
+
+    def get_solver(self):
+        "Return the ``ThreatSolver`` of the player that searches wins by sequences of fours"
+        solver = getattr(self, '_solver', None)
+        if solver is None:
+            solver = self._solver = ThreatSolver()
+        return solver
+
+    def place(self, gui, pos):
+        """
+        Place a stone at `pos` on ``gui.board`` unless `pos` is None.
+        Return ``True`` if a stone has been placed, otherwise return False.
+
+        """
+        if pos is None:
+            return False
+        gui.board[pos] = self.color
+        return True
+
+    def find_on_pattern(self, board, pattern, color, length=None):
+        """
+        Return the target position of the first line of `length` (by
+        default the win length) that shows the `pattern` (see
+        ``PatternTable``) for `color` or None.
+
+        """
+        report = self.get_threat_report(board)
+        lines, targets = report.find(pattern, color, length)
+        if len(lines):
+            return report.positions(lines[0], length)[targets[0,0]]
+
+    def find_pattern_rule(self, board, rule):
+        "Return the position found by the rule `rule` listed in ``pattern_rules`` or None"
+        pattern, relative_color, extra_length = self.pattern_rules[rule]
+        return self.find_on_pattern(board, pattern, relative_color * self.color, board.win_length + extra_length)
+
+    def find_random_move(self, board):
+        "Return a random empty position."
+        return board.random_empty()
+
     def random_move(self, gui):
-        moves_left = gui.board.moves_left
-        while moves_left == gui.board.moves_left:
-            x = np.random.randint(gui.board.width)
-            y = np.random.randint(gui.board.height)
-            try:
-                gui.board[y,x] = self.color
-            except InvalidMoveError:
-                continue
+        return self.place(gui, self.find_random_move(gui.board))
 
-    def extend_one(self, gui):
+    def find_play_center(self, board):
+        "Return the center of the board if it is empty."
+        pos = (board.height // 2, board.width // 2)
+        if board[pos] == empty:
+            return pos
+
+    def play_center(self, gui):
+        return self.place(gui, self.find_play_center(gui.board))
+
+    def find_play_below_center(self, board):
+        "Return the position below the center of the board if it is empty."
+        pos = (board.height // 2 + 1, board.width // 2)
+        if board[pos] == empty:
+            return pos
+
+    def play_below_center(self, gui):
+        return self.place(gui, self.find_play_below_center(gui.board))
+
+    def find_extend_one(self, board):
         "Place a stone next to another one but only if extendable to five."
-        for i in range(gui.board.height):
-            for j in range(gui.board.width):
-                for f in self.line_getter_functions(gui):
-                    try:
-                        line, positions = f(i,j)
-                    except IndexError:
-                        continue
-                # search pattern: one of own color and four empty
-                    if len(np.where(line == empty)[0]) == 4 and len(np.where(line == self.color)[0]) == 1:
-                        index_own_color = np.where(line == self.color)[0][0]
-                        if index_own_color == 0:
-                            gui.board[positions[1]] = self.color
-                            return True
-                        else:
-                            gui.board[positions[index_own_color - 1]] = self.color
-                            return True
-        return False
+        # search pattern: one of own color and four empty
+        return self.find_pattern_rule(board, 'extend_one')
 
-    def block_open_four(self, gui):
+    def extend_one(self, gui):
+        return self.place(gui, self.find_extend_one(gui.board))
+
+    def find_block_open_four(self, board):
         "Block a line of four stones if at least one end open."
-        for i in range(gui.board.height):
-            for j in range(gui.board.width):
-                for f in self.line_getter_functions(gui):
-                    try:
-                        line, positions = f(i,j)
-                    except IndexError:
-                        continue
-
-                    # selection: search four of opponent's color and one empty
-                    if len(np.where(line == empty)[0]) == 1 and len(np.where(line == -self.color)[0]) == 4:
-                        index_of_empty = np.where(line == empty)[0][0]
-                        gui.board[positions[index_of_empty]] = self.color
-                        return True
-        return False
+        # selection: search four of opponent's color and one empty
+        return self.find_pattern_rule(board, 'block_open_four')
 
-    def block_doubly_open_two(self, gui):
-        "Block a line of two if both sides are open."
-        for i in range(gui.board.height):
-            for j in range(gui.board.width):
-                for f in self.line_getter_functions(gui):
-                    try:
-                        line, positions = f(i,j)
-                    except IndexError:
-                        continue
+    def block_open_four(self, gui):
+        return self.place(gui, self.find_block_open_four(gui.board))
 
-                    # select pattern [<all empty>, <opponent's color>, <opponent's color>, <all empty>]
-                    if ( line == (empty, -self.color, -self.color, empty, empty) ).all():
-                        gui.board[positions[3]] = self.color
-                        return True
+    def find_block_doubly_open_two(self, board):
+        "Block a line of two if both sides are open."
+        # select pattern [<all empty>, <opponent's color>, <opponent's color>, <all empty>]
+        return self.find_pattern_rule(board, 'block_doubly_open_two')
 
-                    elif ( line == (empty, empty, -self.color, -self.color, empty) ).all():
-                        gui.board[positions[1]] = self.color
-                        return True
+    def block_doubly_open_two(self, gui):
+        return self.place(gui, self.find_block_doubly_open_two(gui.board))
 
-        return False
+    def find_block_twice_to_three_or_more(self, board):
+        'Prevent opponent from closing two lines of three or more simultaneously.'
+        # search two of opponent's color and three empty in two crossing lines at an empty position
+        if not self.get_threat_map(board).crossings(-self.color, max(board.win_length - 3, 1)).any():
+            return None
+        report = self.get_threat_report(board)
+        lines, targets = report.find('two or more', -self.color)
+        return report.find_crossing(lines, board)
 
     def block_twice_to_three_or_more(self, gui):
-        'Prevent opponent from closing two lines of three or more simultaneously.'
-        line_getter_functions = self.line_getter_functions(gui)
-        line_positions = []
-        getter_functions = []
-        for i in range(gui.board.height):
-            for j in range(gui.board.width):
-                for f in line_getter_functions:
-                    try:
-                        line, positions = f(i,j)
-                    except IndexError:
-                        continue
-                    # search two of opponent's color and three empty in two crossing lines at an empty position
-                    opponent_stones_in_line = len(np.where(line == -self.color)[0])
-                    if opponent_stones_in_line >= 2 and len(np.where(line == empty)[0]) == 5 - opponent_stones_in_line:
-                        for oldpos, old_getter in zip(line_positions, getter_functions):
-                            for pos in positions:
-                                if f != old_getter and pos in oldpos and gui.board[pos] == empty:
-                                    gui.board[pos] = self.color
-                                    return True
-                        line_positions.append(positions)
-                        getter_functions.append(f)
-        return False
+        return self.place(gui, self.find_block_twice_to_three_or_more(gui.board))
 
-    def block_open_three(self, gui):
+    def find_block_open_three(self, board):
         "Block a line of three."
-        for i in range(gui.board.height):
-            for j in range(gui.board.width):
-                for f in self.line_getter_functions(gui):
-                    try:
-                        line, positions = f(i,j)
-                    except IndexError:
-                        continue
-
-                    # selection: search three of opponent's color and two empty
-                    if len(np.where(line == empty)[0]) == 2 and len(np.where(line == -self.color)[0]) == 3:
-                        indices_opponent = np.where(line == -self.color)[0]
-                        if not (indices_opponent[1] == indices_opponent[0] + 1 and \
-                                indices_opponent[2] == indices_opponent[1] + 1):
-                                    continue
-                        if 0 not in indices_opponent:
-                            gui.board[positions[indices_opponent[0] - 1]] = self.color
-                            return True
-                        else:
-                            gui.board[positions[3]] = self.color
-                            return True
-        return False
+        # selection: search three connected of opponent's color and two empty
+        return self.find_pattern_rule(board, 'block_open_three')
 
-    def block_open_two(self, gui):
+    def block_open_three(self, gui):
+        return self.place(gui, self.find_block_open_three(gui.board))
+
+    def find_block_open_two(self, board):
         "Block a line of two."
-        for i in range(gui.board.height):
-            for j in range(gui.board.width):
-                for f in self.line_getter_functions(gui):
-                    try:
-                        line, positions = f(i,j)
-                    except IndexError:
-                        continue
-                    # selection: search pattern [<all empty or bpundary>, opponent, opponent, <all empty or boundary>]
-                    if len(np.where(line == empty)[0]) == 3 and len(np.where(line == -self.color)[0]) == 2:
-                        indices_opponent = np.where(line == -self.color)[0]
-                        if indices_opponent[1] == indices_opponent[0] + 1:
-                            if indices_opponent[0] == 0:
-                                gui.board[positions[3]] = self.color
-                                return True
-                            else:
-                                gui.board[positions[indices_opponent[0]-1]] = self.color
-                                return True
-        return False
+        # selection: search pattern [<all empty or bpundary>, opponent, opponent, <all empty or boundary>]
+        return self.find_pattern_rule(board, 'block_open_two')
 
-    def block_doubly_open_three(self, gui):
+    def block_open_two(self, gui):
+        return self.place(gui, self.find_block_open_two(gui.board))
+
+    def find_block_doubly_open_three(self, board):
         "Block a line of three but only if both sides are open."
-        for i in range(gui.board.height):
-            for j in range(gui.board.width):
-                for f in self.line_getter_functions(gui):
-                    try:
-                        line, positions = f(i,j)
-                    except IndexError:
-                        continue
-
-                    if ( line == (empty, -self.color, -self.color, -self.color, empty) ).all():
-                        gui.board[positions[0]] = self.color
-                        return True
-        return False
+        return self.find_pattern_rule(board, 'block_doubly_open_three')
 
-    def extend_three_to_four(self, gui):
+    def block_doubly_open_three(self, gui):
+        return self.place(gui, self.find_block_doubly_open_three(gui.board))
+
+    def find_extend_three_to_four(self, board):
         """
         Extend a line of three stones to a line of four stones but only
         if there is enough space to be completed to five.
 
         """
-        for i in range(gui.board.height):
-            for j in range(gui.board.width):
-                for f in self.line_getter_functions(gui):
-                    try:
-                        line, positions = f(i,j)
-                    except IndexError:
-                        continue
-                    # selection: search three of own color and two empty
-                    if len(np.where(line == empty)[0]) == 2 and len(np.where(line == self.color)[0]) == 3:
-                        indices_empty = np.where(line == empty)[0]
-                        if 0 not in indices_empty:
-                            gui.board[positions[indices_empty[0]]] = self.color
-                            return True
-                        else:
-                            gui.board[positions[indices_empty[1]]] = self.color
-                            return True
-        return False
+        # selection: search three of own color and two empty
+        return self.find_pattern_rule(board, 'extend_three_to_four')
 
-    def block_to_doubly_open_four(self, gui):
+    def extend_three_to_four(self, gui):
+        return self.place(gui, self.find_extend_three_to_four(gui.board))
+
+    def find_block_to_doubly_open_four(self, board):
         """
         Prevent the opponent from getting a line of four with both ends
         open.
 
         """
-        for i in range(gui.board.height):
-            for j in range(gui.board.width):
-                for f in self.line_getter_functions(gui, length=6):
-                    try:
-                        line, positions = f(i,j)
-                    except IndexError:
-                        continue
-                    # selection: search pattern [empty, <extendable to 4 times opponent>, empty]
-                    if len(np.where(line == empty)[0]) == 3 and len(np.where(line == -self.color)[0]) == 3:
-                        indices_empty = np.where(line == empty)[0]
-                        if not (line[0] == empty and line[-1] == empty):
-                            continue
-                        else:
-                            gui.board[positions[indices_empty[1]]] = self.color
-                            return True
-        return False
+        # selection: search pattern [empty, <extendable to 4 times opponent>, empty]
+        return self.find_pattern_rule(board, 'block_to_doubly_open_four')
 
-    def extend_three_to_doubly_open_four(self, gui):
+    def block_to_doubly_open_four(self, gui):
+        return self.place(gui, self.find_block_to_doubly_open_four(gui.board))
+
+    def find_extend_three_to_doubly_open_four(self, board):
         """
         Extend a line of three stones to a line of four stones but only
         if there is enough space to be completed to five ON BOTH SIDES.
 
         """
-        for i in range(gui.board.height):
-            for j in range(gui.board.width):
-                for f in self.line_getter_functions(gui, length=6):
-                    try:
-                        line, positions = f(i,j)
-                    except IndexError:
-                        continue
-                    # selection: search pattern [empty, <extendable to 4 times own>, empty]
-                    if len(np.where(line == empty)[0]) == 3 and len(np.where(line == self.color)[0]) == 3:
-                        indices_empty = np.where(line == empty)[0]
-                        if not (line[0] == empty and line[-1] == empty):
-                            continue
-                        else:
-                            gui.board[positions[indices_empty[1]]] = self.color
-                            return True
-        return False
+        # selection: search pattern [empty, <extendable to 4 times own>, empty]
+        return self.find_pattern_rule(board, 'extend_three_to_doubly_open_four')
 
-    def extend_two_to_three(self, gui):
+    def extend_three_to_doubly_open_four(self, gui):
+        return self.place(gui, self.find_extend_three_to_doubly_open_four(gui.board))
+
+    def find_extend_two_to_three(self, board):
         """
         Extend a line of two stones to a line of three stones but only
         if there is enough space to be completed to five.
 
         """
-        for i in range(gui.board.height):
-            for j in range(gui.board.width):
-                for f in self.line_getter_functions(gui):
-                    try:
-                        line, positions = f(i,j)
-                    except IndexError:
-                        continue
-                    # selection: search two of own color and three empty
-                    if len(np.where(line == empty)[0]) == 3 and len(np.where(line == self.color)[0]) == 2:
-                        indices_empty = np.where(line == empty)[0]
-                        gui.board[positions[indices_empty[np.random.randint(3)]]] = self.color
-                        return True
-        return False
+        report = self.get_threat_report(board)
+        # selection: search two of own color and three empty
+        lines, targets = report.find('two', self.color)
+        if len(lines):
+            number_of_targets = min(3, np.count_nonzero(targets[0] >= 0))
+            return report.positions(lines[0])[targets[0, np.random.randint(number_of_targets)]]
 
-    def extend_twice_two_to_three(self, gui):
+    def extend_two_to_three(self, gui):
+        return self.place(gui, self.find_extend_two_to_three(gui.board))
+
+    def find_extend_twice_two_to_three(self, board):
         """
         Extend two crossing lines of two stones to two lines of three
         stones but only if there is enough space to be completed to five.
 
         """
-        line_positions = []
-        getter_functions = []
-        for f in self.line_getter_functions(gui):
-            for i in range(gui.board.height):
-                for j in range(gui.board.width):
-                    try:
-                        line, positions = f(i,j)
-                    except IndexError:
-                        continue
-                    # search two of own color and three empty in two crossing lines at an empty position
-                    if len(np.where(line == empty)[0]) == 3 and len(np.where(line == self.color)[0]) == 2:
-                        for oldpos, old_getter in zip(line_positions, getter_functions):
-                            for pos in positions:
-                                if f != old_getter and pos in oldpos and gui.board[pos] == empty:
-                                    gui.board[pos] = self.color
-                                    return True
-                        line_positions.append(positions)
-                        getter_functions.append(f)
-        return False
+        # search two of own color and three empty in two crossing lines at an empty position
+        two = max(board.win_length - 3, 1)
+        if not self.get_threat_map(board).crossings(self.color, two, two).any():
+            return None
+        report = self.get_threat_report(board)
+        lines, targets = report.find('two', self.color)
+        # the lines of one direction are checked before the next direction
+        lines = lines[np.argsort(report.directions(lines), kind='mergesort')]
+        return report.find_crossing(lines, board)
+
+    def extend_twice_two_to_three(self, gui):
+        return self.place(gui, self.find_extend_twice_two_to_three(gui.board))
+
+    def find_win_if_possible(self, board):
+        """
+        Return the position where the player wins immediately if
+        possible, otherwise return None.
+
+        """
+        # selection: line must hold 4 stones of own color and once empty
+        return self.find_pattern_rule(board, 'win_if_possible')
+
+    def find_win_by_force(self, board):
+        """
+        Return the first move of a forced win by a sequence of fours (see
+        ``ThreatSolver``) or None.
+
+        """
+        sequence = self.get_solver().solve(board, self.color)
+        if sequence:
+            return sequence[0]
+
+    def win_by_force(self, gui):
+        return self.place(gui, self.find_win_by_force(gui.board))
+
+    def find_block_forced_win(self, board):
+        """
+        Return a position that stops the opponent's forced win by a
+        sequence of fours if the opponent has one (see
+        ``ThreatSolver.find_defense``) or None.
+
+        """
+        return self.get_solver().find_defense(board, self.color)
+
+    def block_forced_win(self, gui):
+        return self.place(gui, self.find_block_forced_win(gui.board))
 
     def check_if_immediate_win_possible(self, gui):
         """
@@ -296,24 +293,7 @@ class Playerlibrary(object):
         Return the position to place the stone if possible, otherwise return None.
 
         """
-        for i in range(gui.board.height):
-            for j in range(gui.board.width):
-                for f in self.line_getter_functions(gui):
-                    try:
-                        line, positions = f(i,j)
-                    except IndexError:
-                        continue
-                    # selection:
-                    #            - can only place stones where field is ``empty``
-                    #            - line must sum to "+" or "-" 4 (4 times black=+1 or white=-1 and once empty=0)
-
-                    # place stone if that leads to winning the game
-                    if empty in line and line.sum() == self.color * 4:
-                        for pos in positions:
-                            if gui.board[pos] == empty:
-                                return pos
-                        raise RuntimeError("Check the implementation of ``check_if_immediate_win_possible``.")
-        # control reaches this point only if no winning move is found => return None
+        return self.find_win_if_possible(gui.board)
 
     def win_if_possible(self, gui):
         """
@@ -321,12 +301,7 @@ class Playerlibrary(object):
         Return ``True`` if a stone has been placed, otherwise return False.
 
         """
-        pos = self.check_if_immediate_win_possible(gui)
-        if pos is None:
-            return False
-        else:
-            gui.board[pos] = self.color
-            return True
+        return self.place(gui, self.find_win_if_possible(gui.board))
 
 class PlayerTest(unittest.TestCase):
     """
@@ -358,43 +333,54 @@ class PlayerTest(unittest.TestCase):
                             [black, black]]
 
         """
-        board_array = np.asarray(board_array, dtype=int)
-        assert len(board_array.shape) == 2
-        height = board_array.shape[0]
-        width = board_array.shape[1]
-
-        board = Board(width=width, height=height)
-
-        white_indices = []
-        black_indices = []
+        return Board.from_array(board_array)
 
-        # find positions that are not empty
-        for i in range(height):
-            for j in range(width):
-                value = board_array[i,j]
-                if value == empty:
-                    continue
-                elif value == white:
-                    white_indices.append((i,j))
-                elif value == black:
-                    black_indices.append((i,j))
-                else:
-                    raise AssertionError("Invalid ``board_array``")
+    @classmethod
+    def build_win_and_block(self, must_block=False):
+        """
+        Build up a ``Board`` with white in turn, where white and black have
+        a four each that is open on both ends: white wins at (1,0) or
+        (1,5). With `must_block` white's four is broken and white has to
+        block black's four at (3,0) or (3,5).
 
-        # in a valid board, there are equally many black and white stones or
-        # one more white that black stone since white begins
-        assert len(white_indices) == len(black_indices) or len(white_indices) == len(black_indices) + 1
+        """
+        board_array = [[empty, empty, empty, empty, empty, empty, empty, empty],
+                       [empty, white, white, white, white, empty, empty, empty],
+                       [empty, empty, empty, empty, empty, empty, empty, empty],
+                       [empty, black, black, black, black, empty, empty, empty],
+                       [empty, empty, empty, empty, empty, empty, empty, empty],
+                       [empty, empty, empty, empty, empty, empty, empty, empty]]
+        if must_block:
+            board_array[1][1] = empty
+            board_array[5][7] = white
+        return self.build_board(board_array)
 
-        while black_indices:
-            board[white_indices.pop()] = white
-            board[black_indices.pop()] = black
+    @classmethod
+    def build_open_three(self):
+        """
+        Build up a 9x9 ``Board`` with white in turn, where white has an
+        open three in row 4 and wins by an open four at (4,2) or (4,6);
+        black's stones are far away in the corners.
 
-        assert board.winner()[0] is None
+        """
+        board_array = np.zeros((9, 9), dtype=int)
+        board_array[4,3:6] = white
+        board_array[[0, 8, 8],[0, 0, 8]] = black
+        return self.build_board(board_array)
 
-        # if there is one more white stone
-        if white_indices:
-            board[white_indices.pop()] = white
+    @classmethod
+    def random_board(self, number_of_stones, height=13, width=13):
+        """
+        Build up a ``Board`` of `height` x `width` with `number_of_stones`
+        stones placed at random (by ``numpy.random``) such that nobody has
+        won; a stone that would win is left out.
 
+        """
+        board = Board(height, width)
+        for i in range(number_of_stones):
+            board[board.random_empty()] = board.in_turn
+            if board.winner()[0] is not None:
+                board.undo()
         return board
 
     @classmethod
@@ -0,0 +1,88 @@
+"Root-parallel search of the search players on a pool of processes"
+
+from .. import board as board_module
+from ..board import Board
+from multiprocessing import cpu_count, Pool
+import numpy as np
+
+# The parts of a root-parallel search (see ``map_search``) run on a pool of
+# ``_number_of_processes`` processes that is started at the first search
+# and kept for all following moves and games. Every part is searched by a
+# new player: the pool does not send the parts of the next move to the same
+# processes, so tables and trees of earlier moves would not be found again.
+_number_of_processes = cpu_count()
+_process_pool = None
+
+def set_number_of_processes(number_of_processes):
+    "Set the number of processes that search the parts of a root-parallel search"
+    global _number_of_processes, _process_pool
+    if _process_pool is not None:
+        _process_pool.terminate()
+        _process_pool = None
+    _number_of_processes = max(int(number_of_processes), 1)
+
+def get_number_of_processes():
+    "Return the number of processes of the pool"
+    return _number_of_processes
+
+def start_process():
+    """
+    Drop the thread pool of ``board.map_tiles`` that a new process of
+    the pool inherits from the parent; its threads do not exist in the
+    child.
+
+    """
+    board_module._thread_pool = None
+
+def get_process_pool():
+    "Return the pool of processes, start it if necessary"
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = Pool(_number_of_processes, initializer=start_process)
+    return _process_pool
+
+def search_part(task):
+    """
+    Search one part of a root-parallel search in a process of the pool:
+    create a player with the ``search_settings`` of the task and return
+    the result of its ``search_part``.
+
+    """
+    player_type, color, settings, data, part, seed = task
+    player = player_type(color)
+    for name, value in settings.items():
+        setattr(player, name, value)
+    if seed is not None:
+        np.random.seed(seed)
+    return player.search_part(Board.from_bytes(data), part)
+
+def map_search(player, board, parts, seeds=None):
+    """
+    Return the list of the results of ``player.search_part(board, part)``
+    for all `parts` in the order of `parts`; the parts are searched at
+    the same time by new players of the type of `player` in the processes
+    of the pool (one per part) and the `board` is sent to them packed by
+    ``Board.to_bytes``.
+    Every part gets the whole time budget of the `player`: more parts
+    than processes (or a pool of one process, where the parts are
+    searched one after the other in this process) take longer.
+    The random number generator of a process is seeded with the entry of
+    `seeds` (optional) for its part; if the parts are searched one after
+    the other in this process, the generator is not seeded.
+
+    :param player:
+
+        A search player that defines ``search_part`` and the tuple of the
+        names of its attributes ``search_settings`` that are copied to
+        the processes.
+
+    """
+    in_process = len(parts) < 2 or _number_of_processes < 2
+    if seeds is None or in_process:
+        seeds = [None] * len(parts)
+    settings = dict((name, getattr(player, name)) for name in player.search_settings)
+    data = board.to_bytes()
+    tasks = [(type(player), player.color, settings, data, part, seed) for part, seed in zip(parts, seeds)]
+    if in_process:
+        return [search_part(task) for task in tasks]
+    return get_process_pool().map(search_part, tasks, chunksize=1)
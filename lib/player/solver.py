@@ -0,0 +1,235 @@
+"Threat-space search for forced wins by sequences of fours (VCF) and threes (VCT)"
+
+from ..board import Board, black, white, empty
+from ..transposition import TranspositionTable, exact
+from .analysis import ThreatReport
+import numpy as np
+
+class ThreatSolver(object):
+    """
+    Search for a forced win of the color in turn that consists of forcing
+    moves only: the attacker plays fours (lines that lack one stone) that
+    the defender has to block at once and, if `threes` is set, open threes
+    that the defender has to answer inside the threatening lines or with
+    a four of his own.
+    With `threes` the search first looks for a win by fours alone and then
+    deepens the search with threes one attacker's move at a time such
+    that short wins are found first.
+    The search looks at most `max_nodes` positions and the attacker's
+    threats at most ``max_depth`` moves deep; a forced win that is not
+    found within these limits is reported as "none found" (``solve``
+    returns None). ``nodes`` holds the number of positions looked at by
+    the last call of ``solve`` and ``exhausted`` tells if the search hit
+    the node limit.
+    The lines are classified by a ``ThreatReport`` that follows the moves
+    of the search; positions without a forced win are kept in a
+    ``TranspositionTable``.
+
+    :param max_nodes:
+
+        integer, optional; the maximum number of positions to look at per
+        call of ``solve``.
+
+    :param threes:
+
+        bool, optional; if True, also search threats of open threes (VCT),
+        otherwise search fours only (VCF).
+
+    """
+    max_depth = 12
+    table_memory = 2**20
+    # xored to the hash of a position to tell the attackers and the kinds of
+    # threats (fours only or with threes) apart in the table
+    attacker_keys = {(black, False): 0x5bd1e9955bd1e995, (white, False): 0x2545f4914f6cdd1d,
+                     (black, True): 0x9e3779b97f4a7c15, (white, True): 0xc2b2ae3d27d4eb4f}
+
+    def __init__(self, max_nodes=2000, threes=False):
+        self.max_nodes = max_nodes
+        self.threes = threes
+        self.table = TranspositionTable(self.table_memory)
+        # the shape and the win length of the boards in the table
+        self.table_board = None
+        self.nodes = 0
+        self.exhausted = False
+
+    def solve(self, board, color=None):
+        """
+        Return the forcing sequence of moves ``(y,x)`` (attacker and
+        defender alternating, the first move is the attacker's) by which
+        `color` wins on `board` or None if none was found. `color` is by
+        default the color in turn; for the other color the search starts
+        as if it was in turn (e.g. to look for the threats of the
+        opponent). The `board` is not changed.
+
+        """
+        if color is None:
+            color = board.in_turn
+        self.nodes = 0
+        self.exhausted = False
+        if board.winner()[0] is not None or board.full():
+            return None
+        self.color = color
+        if (board.shape, board.win_length) != self.table_board:
+            self.table.clear()
+            self.table_board = (board.shape, board.win_length)
+        self.board = Board.from_array(board.board, color, board.win_length)
+        self.report = ThreatReport(self.board)
+        return self.search()
+
+    def search(self):
+        "Return the winning sequence of ``color`` on the board of the search (see ``solve``) or None"
+        self.nodes = 0
+        self.exhausted = False
+        self.table.new_search()
+        self.with_threes = False
+        sequence = self.attack(self.max_depth)
+        if self.threes:
+            self.with_threes = True
+            for depth in range(1, self.max_depth + 1):
+                if sequence is not None or self.exhausted:
+                    break
+                sequence = self.attack(depth)
+        return sequence
+
+    def find_defense(self, board, color=None):
+        """
+        Return a position where `color` (by default the color in turn)
+        stops the forced win of the opponent on `board` or None if the
+        opponent has no forced win or none of the positions of the
+        opponent's winning sequence stops it; they are tried in order on
+        the board of the search. A search that hits the node limit does
+        not count as stopped. The `board` is not changed.
+
+        """
+        if color is None:
+            color = board.in_turn
+        sequence = self.solve(board, -color)
+        if not sequence:
+            return None
+        # `color` moves first, whichever color is in turn on `board`
+        self.board.in_turn = color
+        for move in sequence:
+            if self.board[move] != empty:
+                continue
+            self.play(move)
+            try:
+                stopped = self.search() is None and not self.exhausted
+            finally:
+                self.undo()
+            if stopped:
+                return move
+
+    def play(self, move):
+        "Place a stone of the color in turn at `move` on the board of the search"
+        self.board[move] = self.board.in_turn
+        self.report.update(self.board)
+
+    def undo(self):
+        "Take back the last move on the board of the search"
+        self.board.undo()
+        self.report.update(self.board)
+
+    def empty_cells(self, lines, length, columns=slice(None)):
+        """
+        Return the distinct empty positions in the `columns` of the `lines`
+        of `length` in the order of the lines.
+
+        """
+        cells = self.report.tables[length].indices[lines][:,columns].ravel()
+        cells = cells[self.board.board.ravel()[cells] == empty]
+        first = np.sort(np.unique(cells, return_index=True)[1])
+        return [divmod(int(cell), self.board.width) for cell in cells[first]]
+
+    def attack(self, depth):
+        """
+        Return the winning sequence of the attacker in turn or None.
+        Try all moves that make a four (and an open three if
+        ``with_threes``) and check if every defense loses.
+
+        """
+        color = self.color
+        key = self.board.hash ^ self.attacker_keys[color, self.with_threes]
+        entry = self.table.probe(key)
+        if entry is not None and entry.depth >= depth:
+            return None
+        self.nodes += 1
+        own_fours = self.board.winning_moves(color)
+        if own_fours:
+            return own_fours[:1]
+        if depth == 0:
+            return None
+        if self.nodes >= self.max_nodes:
+            self.exhausted = True
+            return None
+
+        k = self.board.win_length
+        opposing_fours = self.board.winning_moves(-color)
+        if len(opposing_fours) > 1:
+            return None
+        if opposing_fours:
+            # the opponent threatens to win and has to be blocked; the
+            # threats on the board still stand afterwards
+            candidates = opposing_fours
+        else:
+            candidates = self.empty_cells(self.report.find('three', color, k)[0], k)
+            if self.with_threes and depth >= 2:
+                # a stone inside an open two (in a line of k + 1) makes an
+                # open three, which takes two more moves to win
+                lines = self.report.find('open two', color, k + 1)[0]
+                candidates += [move for move in self.empty_cells(lines, k + 1, slice(1, -1))
+                               if move not in candidates]
+
+        for move in candidates:
+            self.play(move)
+            try:
+                sequence = self.defend(depth)
+            finally:
+                self.undo()
+            if sequence is not None:
+                return [move] + sequence
+        if not self.exhausted:
+            self.table.store(key, depth, exact, 0)
+        return None
+
+    def defend(self, depth):
+        """
+        Return the winning sequence of the attacker against all defenses
+        of the defender in turn or None if one of them holds.
+
+        """
+        color = self.color
+        k = self.board.win_length
+        if self.board.winning_moves(-color):
+            # the defender wins first
+            return None
+        threats = self.board.winning_moves(color)
+        if len(threats) > 1:
+            # two different positions complete a line; one of them cannot be blocked
+            return threats[:2]
+        if threats:
+            defenses = threats
+        else:
+            # answer the open threes inside their lines or with own fours
+            lines = self.report.find('open three', color, k + 1)[0]
+            if not len(lines):
+                return None
+            defenses = self.empty_cells(lines, k + 1)
+            defenses += [move for move in self.empty_cells(self.report.find('three', -color, k)[0], k)
+                         if move not in defenses]
+
+        sequence = None
+        for move in defenses:
+            self.play(move)
+            try:
+                if self.board.winner()[0] is not None:
+                    return None
+                # a four of the defender costs the attacker no depth since
+                # his threats stand after the block
+                continuation = self.attack(depth if self.board.winning_moves(-color) else depth - 1)
+            finally:
+                self.undo()
+            if continuation is None:
+                return None
+            if sequence is None:
+                sequence = [move] + continuation
+        return sequence
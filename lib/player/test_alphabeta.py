@@ -0,0 +1,74 @@
+"Unit tests for the alpha-beta search player"
+
+import time
+from .lib import black, white, empty, PlayerTest
+from ..board import Board
+from .f_alphabeta import *
+
+class TestAlphaBeta(PlayerTest):
+    Player = AlphaBeta
+    def setUp(self):
+        np.random.seed(13572468)
+
+    def test_win_and_block(self):
+        board = self.build_win_and_block()
+        self.assertTrue(AlphaBeta(white).choose_move(board) in [(1,0), (1,5)])
+
+        board = self.build_win_and_block(must_block=True)
+        self.assertEqual(sorted(AlphaBeta(white).rank_moves(board)), [(3,0), (3,5)])
+
+    def test_forced_win(self):
+        board = self.build_open_three()
+        # an open four wins within three plies
+        player = AlphaBeta(white, time_budget=10.)
+        player.max_depth = 3
+        self.assertTrue(player.choose_move(board) in [(4,2), (4,6)])
+        # the two fours of the open four are seen at the leaves
+        self.assertEqual(player.depth, 1)
+
+        # black has to stop the open three
+        board_array = np.zeros((9, 9), dtype=int)
+        board_array[4,3:6] = white
+        board_array[1,4] = black
+        board_array[7,4] = black
+        board = self.build_board(board_array)
+        self.assertEqual(board.in_turn, black)
+        player = AlphaBeta(black, time_budget=10.)
+        player.max_depth = 4
+        self.assertTrue(player.choose_move(board) in [(4,1), (4,2), (4,6), (4,7)])
+
+    def test_time_budget(self):
+        board = self.random_board(30, 15, 15)
+        log, hash = list(board.log), board.hash
+        player = AlphaBeta(board.in_turn, time_budget=.2)
+        start = time.time()
+        move = player.choose_move(board)
+        self.assertTrue(time.time() - start < .4)
+        self.assertEqual(board[move], empty)
+        self.assertTrue(player.nodes > 0)
+        self.assertEqual(board.log, log)
+        self.assertEqual(board.hash, hash)
+
+    def test_table_reuse(self):
+        moves = [(4,8), (5,2), (7,1), (7,4), (8,5), (1,0)]
+        boards = [Board(9, 9), Board(9, 9, win_length=4)]
+        for board in boards:
+            for move in moves:
+                board[move] = board.in_turn
+        player = AlphaBeta(white, time_budget=10.)
+        player.max_depth = 3
+        player.rank_moves(boards[0])
+        self.assertTrue(len(player.table) > 0)
+
+        # the same stones with another win length are not looked up in the
+        # table of the last search
+        fresh = AlphaBeta(white, time_budget=10.)
+        fresh.max_depth = 3
+        self.assertEqual(player.rank_moves(boards[1]), fresh.rank_moves(boards[1]))
+        self.assertEqual(player.iteration_scores, fresh.iteration_scores)
+
+        # the same stones with the other color in turn
+        board = boards[1]
+        key = player.table_key(board)
+        board.in_turn = -board.in_turn
+        self.assertNotEqual(player.table_key(board), key)
@@ -0,0 +1,205 @@
+"Unit tests for the analysis of the lines shared by the AI players"
+
+import unittest
+import numpy as np
+from .. import board as board_module
+from ..board import Board, black, white, empty, set_number_of_threads
+from .analysis import *
+from .lib import Playerlibrary
+
+class TestPatternTable(unittest.TestCase):
+    def test_encoding(self):
+        table = get_pattern_table(5)
+        line = np.array([white, empty, black, black, white])
+        self.assertEqual(table.encode(line[None,:], black)[0], 2 + 0 * 3 + 1 * 9 + 1 * 27 + 2 * 81)
+        np.testing.assert_equal(table.digits[table.encode(line[None,:], white)[0]], [1, 0, 2, 2, 1])
+
+    def test_patterns(self):
+        table = get_pattern_table(5)
+        codes = table.encode(np.array([[empty, black, black, black, empty],
+                                       [black, black, empty, black, empty],
+                                       [empty, empty, black, black, empty],
+                                       [black, black, black, black, white]]), black)
+        np.testing.assert_equal(table.match['doubly open three'][codes], [True, False, False, False])
+        np.testing.assert_equal(table.match['connected three'][codes], [True, False, False, False])
+        np.testing.assert_equal(table.match['three'][codes], [True, True, False, False])
+        np.testing.assert_equal(table.match['doubly open two'][codes], [False, False, True, False])
+        np.testing.assert_equal(table.match['four'][codes], [False, False, False, False])
+        np.testing.assert_equal(table.targets['three'][codes[1]], [2])
+        np.testing.assert_equal(table.targets['doubly open two'][codes[2]], [1])
+        np.testing.assert_equal(table.targets['two'][codes[2]], [0, 1, 4])
+
+    def test_add_pattern(self):
+        table = PatternTable(3)
+        table.add_pattern('gap', (table.digits == (1, 0, 1)).all(axis=1), 1)
+        code = table.encode(np.array([[white, empty, white]]), white)[0]
+        self.assertTrue(table.match['gap'][code])
+        self.assertEqual(table.targets['gap'][code, 0], 1)
+        self.assertEqual(table.targets['gap'][code + 1, 0], -1)
+
+class TestThreatReport(unittest.TestCase):
+    def setUp(self):
+        np.random.seed(65432)
+        self.board = Board(9, 10)
+        for i in range(24):
+            self.board[self.board.random_empty()] = self.board.in_turn
+
+    def test_find(self):
+        report = ThreatReport(self.board)
+        for length in (5, 6):
+            lines, table = self.board.get_lines(length)
+            for color in (white, black):
+                number_own = (lines == color).sum(axis=1)
+                number_opponent = (lines == -color).sum(axis=1)
+                target_lines = np.flatnonzero((number_own >= 2) & (number_opponent == 0))
+                np.testing.assert_equal(report.find('two or more', color, length)[0], target_lines)
+
+        lines, table = self.board.get_lines(5)
+        for color in (white, black):
+            found_lines, targets = report.find('connected two', color)
+            target_lines = []
+            for i, line in enumerate(lines):
+                own = np.flatnonzero(line == color)
+                if len(own) == 2 and own[1] == own[0] + 1 and not (line == -color).any():
+                    target_lines.append(i)
+            np.testing.assert_equal(found_lines, target_lines)
+            for line, target in zip(found_lines, targets[:,0]):
+                self.assertEqual(lines[line][target], empty)
+
+    def test_find_first(self):
+        report = ThreatReport(self.board)
+        patterns = ['one', 'two', 'connected two', 'three', 'four']
+        for color in (white, black):
+            first_lines = report.find_first(patterns, color)
+            for pattern, line in zip(patterns, first_lines):
+                lines, targets = report.find(pattern, color)
+                if len(lines):
+                    self.assertEqual(line, lines[0])
+                    self.assertEqual(report.target(pattern, color, line), report.positions(line)[targets[0,0]])
+                else:
+                    self.assertEqual(line, -1)
+
+    def test_find_crossing(self):
+        report = ThreatReport(self.board)
+        for pattern, color in (('two or more', white), ('two or more', black), ('two', black), ('one', white)):
+            lines = report.find(pattern, color)[0]
+            np.random.shuffle(lines)
+            # compare each line with all earlier lines
+            target = None
+            for i, line in enumerate(lines):
+                for old_line in lines[:i]:
+                    if report.directions(line) == report.directions(old_line):
+                        continue
+                    common = [pos for pos in report.positions(line) if pos in report.positions(old_line)
+                              and self.board[pos] == empty]
+                    if common:
+                        target = common[0]
+                        break
+                if target is not None:
+                    break
+            self.assertEqual(report.find_crossing(lines, self.board), target)
+        self.assertTrue(report.find_crossing(lines[:0], self.board) is None)
+
+    def test_win_length(self):
+        np.random.seed(24680)
+        for win_length in (4, 6):
+            board = Board(9, 10, win_length)
+            for i in range(30):
+                board[board.random_empty()] = board.in_turn
+            report = ThreatReport(board)
+            self.assertEqual(report.lengths, (win_length, win_length + 1))
+            lines, table = board.get_lines(win_length)
+            for color in (white, black):
+                for pattern, number_own in (('four', win_length - 1), ('three', win_length - 2)):
+                    found_lines, targets = report.find(pattern, color)
+                    target_lines = np.flatnonzero(((lines == color).sum(axis=1) == number_own) &
+                                                  ~(lines == -color).any(axis=1))
+                    np.testing.assert_equal(found_lines, target_lines)
+                    for line, target in zip(found_lines, targets[:,0]):
+                        self.assertEqual(lines[line][target], empty)
+
+            player = Playerlibrary()
+            player.color = board.in_turn
+            found_lines, targets = report.find('four', player.color)
+            move = player.find_win_if_possible(board)
+            if len(found_lines):
+                board[move] = board.in_turn
+                self.assertEqual(board.winner()[0], player.color)
+            else:
+                self.assertTrue(move is None)
+        self.assertFalse(report.update(Board(9, 10)))
+
+    def test_tiles(self):
+        parallel_cells, number_of_threads = board_module.parallel_cells, board_module._number_of_threads
+        board_module.parallel_cells = 0
+        set_number_of_threads(3)
+        try:
+            self.check_tiles()
+        finally:
+            board_module.parallel_cells = parallel_cells
+            set_number_of_threads(number_of_threads)
+
+    def check_tiles(self):
+        board = Board(83, 37)
+        for i in range(500):
+            board[board.random_empty()] = board.in_turn
+        report = ThreatReport(board)
+        self.assertTrue(len(report.tables[5].tiles) > 1)
+        patterns = ['four', 'three', 'connected two', 'one', 'doubly open two']
+        for length in report.lengths:
+            lines, table = board.get_lines(length)
+            pattern_table = get_pattern_table(length)
+            for color in (white, black):
+                codes = pattern_table.encode(lines, color)
+                np.testing.assert_equal(report.codes[length, color], codes)
+                np.testing.assert_equal(report.find('two or more', color, length)[0],
+                                        np.flatnonzero(pattern_table.match['two or more'][codes]))
+                if length == 5:
+                    for pattern, line in zip(patterns, report.find_first(patterns, color)):
+                        matching = np.flatnonzero(pattern_table.match[pattern][codes])
+                        self.assertEqual(line, matching[0] if len(matching) else -1)
+
+    def test_describes(self):
+        report = ThreatReport(self.board)
+        self.assertTrue(report.describes(self.board))
+        self.board[self.board.random_empty()] = self.board.in_turn
+        self.assertFalse(report.describes(self.board))
+        self.board.undo()
+        self.assertTrue(report.describes(self.board))
+
+    def test_update(self):
+        report = ThreatReport(self.board)
+        for i in range(30):
+            if np.random.rand() < .3:
+                self.board.undo()
+            else:
+                self.board[self.board.random_empty()] = self.board.in_turn
+            self.assertTrue(report.update(self.board))
+            self.assertTrue(report.describes(self.board))
+            rebuilt = ThreatReport(self.board)
+            for key, codes in rebuilt.codes.items():
+                np.testing.assert_equal(report.codes[key], codes)
+
+        # the same position reached in a different order
+        moves = self.board.log[-3:]
+        for i in range(3):
+            self.board.undo()
+        for move in moves[::-1]:
+            self.board[move] = self.board.in_turn
+        self.assertTrue(report.update(self.board))
+        self.assertEqual(report.log, self.board.log)
+
+        # stones that are not in the log
+        board = Board.from_array(self.board.board)
+        self.assertFalse(ThreatReport(Board(9, 10)).update(board))
+
+    def test_report_is_shared(self):
+        player = Playerlibrary()
+        player.color = self.board.in_turn
+        report = player.get_threat_report(self.board)
+        self.assertTrue(player.get_threat_report(self.board) is report)
+        self.board[self.board.random_empty()] = self.board.in_turn
+        self.assertTrue(player.get_threat_report(self.board) is report)
+        self.assertTrue(report.describes(self.board))
+        self.board.reset()
+        self.assertFalse(player.get_threat_report(self.board) is report)
@@ -0,0 +1,58 @@
+"Unit tests for the rule engine of the heuristic players"
+
+import unittest
+import numpy as np
+from ..board import Board, black, white, empty
+from . import Player
+from .c_hard import Hard
+from .engine import *
+
+class TestRuleEngine(unittest.TestCase):
+    def setUp(self):
+        np.random.seed(97531)
+
+    def first_applicable_rule(self, player, board):
+        "Call the rules one after the other"
+        for rule in player.rules:
+            pos = getattr(player, 'find_' + rule)(board)
+            if pos is not None:
+                return rule, tuple(pos)
+
+    def test_same_as_rule_by_rule(self):
+        board = Board(10, 11)
+        players = {white: Hard(white), black: Hard(black)}
+        decided = {}
+        while board.winner()[0] is None and not board.full():
+            player = players[board.in_turn]
+            state = np.random.get_state()
+            rule, target = self.first_applicable_rule(player, board)
+            np.random.set_state(state)
+            move = player.choose_move(board)
+            self.assertEqual(tuple(move), target)
+            decided[rule] = decided.get(rule, 0) + 1
+            board[move] = player.color
+
+        hits = {}
+        for player in players.values():
+            for rule, number in player.engine.hits.items():
+                hits[rule] = hits.get(rule, 0) + number
+        self.assertEqual(dict((rule, number) for rule, number in hits.items() if number), decided)
+        self.assertEqual(sum(player.engine.calls for player in players.values()), len(board.log))
+        self.assertAlmostEqual(sum(players[white].engine.hit_rates().values()), 1.)
+
+    def test_custom_rules(self):
+        class Blocker(Player):
+            name = 'Blocker'
+            rules = ('block_open_four', 'block_open_three', 'play_center')
+
+        board = Board(7, 7)
+        for pos in ((3,1), (0,0), (3,2), (0,6), (3,3)):
+            board[pos] = board.in_turn
+        player = Blocker(black)
+        self.assertEqual(player.rank_moves(board), [(3,0)]) # the center is taken
+        self.assertEqual(player.choose_move(board), (3,0))
+        self.assertEqual(player.engine.hits['block_open_three'], 1)
+
+        player.engine.reset_statistics()
+        self.assertEqual(player.engine.calls, 0)
+        self.assertEqual(player.engine.hit_rates()['block_open_three'], 0.)
@@ -0,0 +1,68 @@
+"Unit tests for the Monte Carlo tree search player"
+
+import time
+from .lib import black, white, empty, PlayerTest
+from .g_mcts import *
+
+class TestMonteCarlo(PlayerTest):
+    Player = MonteCarlo
+    def setUp(self):
+        np.random.seed(24681357)
+
+    def test_win_and_block(self):
+        board = self.build_win_and_block()
+        player = MonteCarlo(white, time_budget=10.)
+        self.assertEqual(player.forced_moves(board), [(1,0)])
+        self.assertEqual(player.choose_move(board), (1,0))
+        self.assertEqual(player.playouts, 1)
+
+        board = self.build_win_and_block(must_block=True)
+        player = MonteCarlo(white, time_budget=10.)
+        player.max_playouts = 200
+        self.assertEqual(player.forced_moves(board), [(3,0), (3,5)])
+        self.assertEqual(sorted(player.rank_moves(board)), [(3,0), (3,5)])
+
+    def test_rollout(self):
+        board = self.random_board(20)
+        log, hash = list(board.log), board.hash
+        player = MonteCarlo(board.in_turn)
+        for i in range(20):
+            self.assertTrue(player.rollout(board) in (black, white, empty))
+            self.assertEqual(board.log, log)
+            self.assertEqual(board.hash, hash)
+
+    def test_tree_reuse(self):
+        board = self.random_board(20)
+        player = MonteCarlo(board.in_turn, time_budget=10.)
+        player.max_playouts = 300
+        move = player.choose_move(board)
+        self.assertEqual(player.playouts, 300)
+        self.assertEqual(player.root.visits, 300)
+
+        # the reply of the opponent searched most in the last search
+        child = [child for child in player.root.children if child.move == move][0]
+        reply = max(child.children, key=lambda grandchild: grandchild.visits)
+        board[move] = board.in_turn
+        board[reply.move] = board.in_turn
+        visits = reply.visits
+        player.choose_move(board)
+        self.assertTrue(player.root is reply)
+        self.assertEqual(player.root.visits, visits + 300)
+        self.assertTrue(player.root.parent is None)
+
+        # a position that is not in the tree starts a new tree
+        player.choose_move(self.random_board(10))
+        self.assertEqual(player.root.visits, 300)
+
+    def test_time_budget(self):
+        board = self.random_board(30)
+        log, hash = list(board.log), board.hash
+        player = MonteCarlo(board.in_turn, time_budget=.2)
+        start = time.time()
+        move = player.choose_move(board)
+        self.assertTrue(time.time() - start < .4)
+        self.assertEqual(board[move], empty)
+        self.assertTrue(player.playouts > 0)
+        self.assertTrue(player.playouts_per_second > 0)
+        self.assertEqual(board.log, log)
+        self.assertEqual(board.hash, hash)
@@ -0,0 +1,126 @@
+"Unit tests for the root-parallel search"
+
+from .lib import black, white, empty, PlayerTest
+from ..board import Board
+from .f_alphabeta import AlphaBeta
+from .g_mcts import MonteCarlo
+from .parallel import *
+from . import parallel as parallel_module
+import numpy as np
+import time
+
+class TestParallel(PlayerTest):
+    def setUp(self):
+        np.random.seed(97531864)
+        self.number_of_processes = parallel_module.get_number_of_processes()
+        set_number_of_processes(2)
+
+    def tearDown(self):
+        set_number_of_processes(self.number_of_processes)
+
+    def test_alphabeta(self):
+        board = self.build_open_three()
+        player = AlphaBeta(white, time_budget=10., processes=2)
+        player.max_depth = 3
+        self.assertTrue(player.choose_move(board) in [(4,2), (4,6)])
+        # the two fours of the open four are seen at the leaves
+        self.assertEqual(player.depth, 1)
+
+        board = self.random_board(20)
+        log, hash = list(board.log), board.hash
+        sequential = AlphaBeta(board.in_turn, time_budget=10.)
+        sequential.max_depth = 2
+        moves = sequential.rank_moves(board)
+        player = AlphaBeta(board.in_turn, time_budget=10., processes=3)
+        player.max_depth = 2
+        parallel_moves = player.rank_moves(board)
+        self.assertEqual(sorted(parallel_moves), sorted(moves))
+        self.assertEqual(player.depth, 2)
+        # the best score is exact in both searches
+        scores = sequential.iteration_scores[-1]
+        self.assertEqual(scores[parallel_moves[0]], scores[moves[0]])
+        self.assertEqual(board.log, log)
+        self.assertEqual(board.hash, hash)
+
+    def test_more_processes_than_moves(self):
+        set_number_of_processes(8)
+        board = self.random_board(30)
+        player = AlphaBeta(board.in_turn, time_budget=10., processes=8)
+        player.max_depth = 2
+        moves = player.candidates(board)
+        self.assertTrue(1 < len(moves) <= 8)
+        self.assertEqual(sorted(player.rank_moves(board)), sorted(moves))
+        self.assertEqual(player.depth, 2)
+        # a part of a single move is searched as well
+        player.search(board, moves[:1])
+        self.assertEqual([list(scores) for scores in player.iteration_scores], [moves[:1]] * 2)
+
+    def test_independent_trees(self):
+        set_number_of_processes(1)
+        board = self.random_board(20)
+        player = MonteCarlo(board.in_turn)
+        player.max_playouts = 100
+        for search in range(2):
+            # every part searches a new tree
+            results = map_search(player, board, [0, 1], seeds=[5, 5])
+            for children, playouts in results:
+                self.assertEqual(playouts, 100)
+                self.assertEqual(sum(visits for move, visits in children), 100)
+            # the random number generator is not seeded in this process
+            self.assertNotEqual(results[0], results[1])
+
+    def test_threads_in_parent(self):
+        from .. import board as board_module
+        parallel_cells, number_of_threads = board_module.parallel_cells, board_module._number_of_threads
+        board_module.parallel_cells = 0
+        board_module.set_number_of_threads(2)
+        try:
+            # a board of two tiles
+            board = Board(40, 40)
+            for i in range(20):
+                board[board.random_empty()] = board.in_turn
+            # start the thread pool of ``map_tiles`` before the processes
+            board.get_line_counts(7)
+            self.assertTrue(board_module._thread_pool is not None)
+            set_number_of_processes(2)
+            player = MonteCarlo(board.in_turn, processes=2)
+            player.max_playouts = 20
+            player.choose_move(board)
+            self.assertEqual(player.playouts, 40)
+        finally:
+            board_module.parallel_cells = parallel_cells
+            board_module.set_number_of_threads(number_of_threads)
+
+    def test_monte_carlo(self):
+        board = self.random_board(20)
+        log, hash = list(board.log), board.hash
+        player = MonteCarlo(board.in_turn, time_budget=10., processes=2)
+        player.max_playouts = 100
+        moves = player.rank_moves(board)
+        self.assertEqual(player.playouts, 200)
+        self.assertTrue(player.playouts_per_second > 0)
+        self.assertTrue(all(board[move] == empty for move in moves))
+        self.assertEqual(board.log, log)
+        self.assertEqual(board.hash, hash)
+
+    def test_sequential(self):
+        set_number_of_processes(1)
+        board = self.random_board(20)
+        player = MonteCarlo(board.in_turn, time_budget=10., processes=2)
+        player.max_playouts = 50
+        player.choose_move(board)
+        # a single tree is searched in this process
+        self.assertEqual(player.playouts, 50)
+        self.assertTrue(parallel_module._process_pool is None)
+
+    def test_time_budget(self):
+        board = self.random_board(20)
+        for number_of_processes in (1, 2):
+            set_number_of_processes(number_of_processes)
+            for player in (AlphaBeta(board.in_turn, time_budget=.3, processes=4),
+                           MonteCarlo(board.in_turn, time_budget=.3, processes=4)):
+                # start the pool before the clock
+                player.rank_moves(board)
+                start = time.time()
+                player.rank_moves(board)
+                self.assertTrue(time.time() - start < .55)
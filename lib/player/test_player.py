@@ -6,7 +6,7 @@ try:
     import Tkinter as tk # python 2
 except ImportError:
     import tkinter as tk # python 3
-from ..board import Board, black, white
+from ..board import Board, black, white, empty
 from ..gui import BoardGui
 from . import *
 
@@ -35,3 +35,70 @@ class TestPlayerManagement(unittest.TestCase):
             self.assertEqual(index, 0)
 
         self.assertRaisesRegexp(ValueError, '"Foo".*not.*registered', get_player_index, 'Foo')
+
+class TestChooseMove(unittest.TestCase):
+    def get_players(self):
+        from .a_easy import Easy
+        from .b_medium import Medium
+        from .c_hard import Hard
+        from .learning import Learning
+        return [Easy, Medium, Hard,
+                lambda color: Learning(color, white_logfile='test_choose_move.log', black_logfile='test_choose_move.log')]
+
+    def test_headless_game(self):
+        for Player in self.get_players():
+            np.random.seed(5555)
+            board = Board(height=8, width=9)
+            players = {white: Player(white), black: Player(black)}
+            while board.winner()[0] is None and not board.full():
+                player = players[board.in_turn]
+                array, log, moves_left = board.board.copy(), list(board.log), board.moves_left
+
+                state = np.random.get_state()
+                ranked_moves = player.rank_moves(board)
+                np.random.set_state(state)
+                move = player.choose_move(board)
+
+                np.testing.assert_equal(board.board, array)
+                self.assertEqual(board.log, log)
+                self.assertEqual(board.moves_left, moves_left)
+                self.assertEqual(tuple(ranked_moves[0]), tuple(move))
+                self.assertEqual(len(set(ranked_moves)), len(ranked_moves))
+                board[move] = player.color
+
+    def test_small_boards(self):
+        # no line of the win length fits onto the board
+        for Player in self.get_players():
+            for height, width in ((3, 3), (4, 4)):
+                np.random.seed(5555)
+                board = Board(height, width)
+                players = {white: Player(white), black: Player(black)}
+                while not board.full():
+                    board[players[board.in_turn].choose_move(board)] = board.in_turn
+                self.assertTrue(board.winner()[0] is None)
+
+    def test_win_lengths(self):
+        for Player in self.get_players():
+            for win_length in (3, 4):
+                np.random.seed(5555)
+                board = Board(7, 7, win_length=win_length)
+                players = {white: Player(white), black: Player(black)}
+                while board.winner()[0] is None and not board.full():
+                    board[players[board.in_turn].choose_move(board)] = board.in_turn
+
+    def test_ranked_moves_empty(self):
+        # a "two" of the win length 3 is a single stone with two empty positions
+        for Player in self.get_players()[:3]:
+            np.random.seed(4242)
+            for game in range(10):
+                board = Board(7, 7, win_length=3)
+                for i in range(np.random.randint(2, 12)):
+                    board[board.random_empty()] = board.in_turn
+                    if board.winner()[0] is not None:
+                        board.undo()
+                        break
+                for move in Player(board.in_turn).rank_moves(board):
+                    self.assertEqual(board[move], empty)
+
+    def test_not_implemented(self):
+        self.assertRaises(NotImplementedError, Player(white).choose_move, Board(width=2, height=4))
@@ -0,0 +1,43 @@
+"Unit tests for the Scoring player"
+
+from .lib import black, white, empty, PlayerTest
+from ..board import Board
+from .e_scoring import *
+
+class TestScoring(PlayerTest):
+    Player = Scoring
+    def setUp(self):
+        np.random.seed(4242524)
+
+    def test_win_and_block(self):
+        board = self.build_win_and_block()
+        self.assertEqual(board.in_turn, white)
+        self.assertTrue(Scoring(white).choose_move(board) in [(1,0), (1,5)])
+        self.assertTrue(Scoring(black).choose_move(board) in [(3,0), (3,5)])
+
+        # white cannot win but has to block
+        board = self.build_win_and_block(must_block=True)
+        self.assertTrue(Scoring(white).choose_move(board) in [(3,0), (3,5)])
+
+    def test_scores(self):
+        for win_length in (5, 6, 4):
+            board = Board(7, 9, win_length)
+            for i in range(14):
+                board[board.random_empty()] = board.in_turn
+            player = Scoring(white)
+            scores = player.score_moves(board)
+
+            lines, table = board.get_lines(win_length)
+            target = np.zeros(board.height * board.width)
+            for color, weights in ((white, player.own_weights), (black, player.opponent_weights)):
+                for line, indices in zip(lines, table.indices):
+                    if not (line == -color).any():
+                        missing = win_length - (line == color).sum()
+                        target[indices] += weights[min(max(missing - 1, 0), len(weights) - 1)]
+            target[board.board.ravel() != empty] = -np.inf
+            np.testing.assert_allclose(scores.ravel(), target)
+
+            ranked_moves = player.rank_moves(board)
+            self.assertEqual(ranked_moves[0], player.choose_move(board))
+            self.assertEqual(len(ranked_moves), board.moves_left)
+            self.assertTrue((np.diff([scores[pos] for pos in ranked_moves]) <= 0).all())
@@ -0,0 +1,83 @@
+"Unit tests for the threat-space search"
+
+import unittest
+import numpy as np
+from ..board import Board, black, white, empty
+from .c_hard import Hard
+from .solver import *
+
+class TestThreatSolver(unittest.TestCase):
+    def double_four(self, color):
+        "Return a board where `color` makes two fours at (5,6)"
+        board_array = np.zeros((11, 11), dtype=int)
+        board_array[5,[3,4,5]] = color
+        board_array[[2,3,4],6] = color
+        board_array[5,2] = board_array[1,6] = -color
+        board_array[10,[0,2,4,8]] = -color
+        return Board.from_array(board_array)
+
+    def replay(self, board, sequence):
+        "Return a copy of `board` after the moves in `sequence`"
+        board = Board.from_array(board.board, board.in_turn)
+        for move in sequence:
+            board[move] = board.in_turn
+        return board
+
+    def test_double_four(self):
+        board = self.double_four(white)
+        log, hash = list(board.log), board.hash
+        solver = ThreatSolver()
+        sequence = solver.solve(board)
+        self.assertEqual(sequence[0], (5,6))
+        self.assertEqual(self.replay(board, sequence).winner()[0], white)
+        self.assertEqual((board.log, board.hash), (log, hash))
+        self.assertTrue(solver.solve(board, black) is None)
+        self.assertFalse(solver.exhausted)
+
+    def test_threes(self):
+        board_array = np.zeros((13, 13), dtype=int)
+        board_array[7,[5,6]] = white
+        board_array[[5,6],7] = white
+        board_array[0,[0,2,4,8]] = black
+        board = Board.from_array(board_array)
+        self.assertTrue(ThreatSolver().solve(board) is None)
+        solver = ThreatSolver(threes=True)
+        sequence = solver.solve(board)
+        self.assertEqual(sequence[0], (7,7))
+        self.assertEqual(self.replay(board, sequence).winner()[0], white)
+
+    def test_random_positions(self):
+        np.random.seed(86420)
+        solver = ThreatSolver()
+        for game in range(10):
+            board = Board(13, 13)
+            for i in range(40):
+                board[board.random_empty()] = board.in_turn
+                if board.winner()[0] is not None:
+                    board.undo()
+            sequence = solver.solve(board)
+            if sequence is not None:
+                self.assertEqual(self.replay(board, sequence).winner()[0], board.in_turn)
+
+    def test_node_limit(self):
+        board = self.double_four(white)
+        solver = ThreatSolver(max_nodes=1)
+        self.assertTrue(solver.solve(board) is None)
+        self.assertTrue(solver.exhausted)
+
+    def test_hard_blocks_forced_win(self):
+        board = self.double_four(black)
+        log, hash = list(board.log), board.hash
+        player = Hard(board.in_turn)
+        self.assertEqual(player.find_block_forced_win(board), (5,6))
+        self.assertEqual((board.log, board.hash), (log, hash))
+        # the board is not changed even if the player is not in turn
+        board_array = board.board.copy()
+        board_array[10,10] = white
+        board = Board.from_array(board_array)
+        self.assertEqual(board.in_turn, black)
+        log, hash = list(board.log), board.hash
+        self.assertEqual(player.find_block_forced_win(board), (5,6))
+        self.assertEqual((board.log, board.hash), (log, hash))
+        self.assertEqual(player.choose_move(board), (5,6))
+        self.assertEqual(Hard(black).find_win_by_force(board), (5,6))
@@ -0,0 +1,101 @@
+"Unit tests for the per-position threat maps"
+
+import unittest
+import numpy as np
+from .. import board as board_module
+from ..board import Board, black, white, empty, set_number_of_threads
+from .threatmap import *
+
+class TestThreatMap(unittest.TestCase):
+    def build_board(self, height, width, number_of_stones):
+        board = Board(height, width)
+        for i in range(number_of_stones):
+            board[board.random_empty()] = board.in_turn
+        return board
+
+    def test_window_sums(self):
+        values = np.arange(12).reshape(2,6)
+        np.testing.assert_equal(window_sums(values, 3), [[3, 6, 9, 12], [21, 24, 27, 30]])
+        self.assertEqual(window_sums(values, 7).shape, (2,0))
+
+    def test_layout(self):
+        layout = get_line_layout(3, 4)
+        for line_cells in layout.cells:
+            on_board = line_cells[line_cells != layout.sentinel]
+            np.testing.assert_equal(np.sort(on_board), np.arange(12))
+        np.testing.assert_equal(layout.cells[2][0][:3], [0, 5, 10])
+
+    def test_live_lines(self):
+        np.random.seed(2345)
+        for height, width in ((9, 10), (3, 4), (6, 13)):
+            board = self.build_board(height, width, min(40, height * width // 2))
+            threat_map = ThreatMap(board)
+            lines, table = board.get_lines(5)
+            for color in (black, white):
+                for minimum, maximum in ((0, 5), (2, 5), (2, 2)):
+                    number_own = (lines == color).sum(axis=1)
+                    live = ((lines == -color).sum(axis=1) == 0) & (number_own >= minimum) & (number_own <= maximum)
+                    target = np.zeros((4, height * width), dtype=int)
+                    for line in np.flatnonzero(live):
+                        target[table.directions[line], table.indices[line]] += 1
+                    np.testing.assert_equal(threat_map.live_lines(color, minimum, maximum),
+                                            target.reshape(4, height, width))
+
+    def test_tiles(self):
+        parallel_cells, number_of_threads = board_module.parallel_cells, board_module._number_of_threads
+        board_module.parallel_cells = 0
+        set_number_of_threads(3)
+        try:
+            np.random.seed(9753)
+            board = self.build_board(71, 39, 400)
+            threat_map = ThreatMap(board)
+            self.assertTrue(len(threat_map.layout.tiles[0]) > 1)
+            lines, table = board.get_lines(5)
+            weights = np.array([1, 10, 100, 1000, 10000, 100000])
+            for color in (black, white):
+                number_own = (lines == color).sum(axis=1)
+                live = (lines == -color).sum(axis=1) == 0
+                target = np.zeros((4, board.height * board.width), dtype=int)
+                weighted = np.zeros(board.height * board.width, dtype=int)
+                np.add.at(target, (table.directions[live,None], table.indices[live]), number_own[live,None] >= 1)
+                np.add.at(weighted, table.indices[live], weights[number_own[live],None])
+                np.testing.assert_equal(threat_map.live_lines(color, 1), target.reshape(4, board.height, board.width))
+                np.testing.assert_equal(threat_map.weighted_lines(color, weights), weighted.reshape(board.shape))
+        finally:
+            board_module.parallel_cells = parallel_cells
+            set_number_of_threads(number_of_threads)
+
+    def test_crossings(self):
+        board = Board(7, 7)
+        for white_stone, black_stone in (((3,1), (6,0)), ((3,2), (6,6)), ((1,4), (0,0)), ((2,4), (0,6))):
+            board[white_stone] = white
+            board[black_stone] = black
+        crossings = ThreatMap(board).crossings(white, 2)
+        self.assertTrue(crossings[3,4])
+        self.assertFalse(crossings[3,2])
+        self.assertFalse(ThreatMap(board).crossings(black, 3).any())
+
+    def test_describes(self):
+        board = Board(5, 6)
+        threat_map = ThreatMap(board)
+        self.assertTrue(threat_map.describes(board))
+        board[2,2] = white
+        self.assertFalse(threat_map.describes(board))
+
+    def test_update(self):
+        np.random.seed(8642)
+        board = self.build_board(8, 11, 10)
+        threat_map = ThreatMap(board)
+        for i in range(30):
+            if board.log and np.random.rand() < .3:
+                board.undo()
+            else:
+                board[board.random_empty()] = board.in_turn
+            self.assertTrue(threat_map.update(board))
+            rebuilt = ThreatMap(board)
+            np.testing.assert_equal(threat_map.empty, rebuilt.empty)
+            for color in (black, white):
+                np.testing.assert_equal(threat_map.live_lines(color, 1), rebuilt.live_lines(color, 1))
+        board.reset()
+        board[4,4] = white
+        self.assertFalse(threat_map.update(board))
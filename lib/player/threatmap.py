@@ -0,0 +1,131 @@
+"Per-position threat maps of a game board computed with cumulative sums"
+
+from ..board import black, white, empty, directions, get_line_layout, window_sums, map_tiles, join_tiles
+from .analysis import IncrementalAnalysis
+import numpy as np
+
+class ThreatMap(IncrementalAnalysis):
+    """
+    Per-position view of the lines (windows) of `length` on the `board`.
+    For both colors and each direction the number of own and opposing
+    stones in every window is computed by cumulative sums along the
+    sheared board (see ``LineLayout``); positions off the board count as
+    opposing stones such that windows that do not fit onto the board are
+    always blocked. On large boards the lines are processed in tiles on a
+    pool of threads (see ``map_tiles`` in "board.py").
+    Placing or taking back a stone changes the counts of the windows
+    through that position only (see ``IncrementalAnalysis.update``).
+    Check with ``describes`` (or call ``update``) before reusing a map.
+
+    :param board:
+
+        The game ``Board`` as described in "board.py".
+
+    :param length:
+
+        integer, optional; the length of the windows, by default the win
+        length of the `board`.
+
+    """
+    def __init__(self, board, length=None):
+        super(ThreatMap, self).__init__(board)
+        self.length = length or board.win_length
+        self.layout = get_line_layout(*board.shape)
+        # the contents of the board followed by the sentinel
+        cells = np.append(board.board.ravel(), empty)
+        self.empty = (cells == empty)[:-1].reshape(self.shape)
+        self.stones = {}
+        self._live_lines = {}
+        for color in (black, white):
+            own = (cells == color).astype('int8')
+            opposing = (cells == -color).astype('int8')
+            opposing[-1] = 1
+            self.stones[color] = [(self._window_sums(own, direction), self._window_sums(opposing, direction))
+                                  for direction in range(len(directions))]
+
+    def _window_sums(self, cells, direction):
+        "Return the sums of the `cells` (as in ``LineLayout``) over the windows in `direction`"
+        line_cells = self.layout.cells[direction]
+        return join_tiles(map_tiles(lambda tile: window_sums(cells[line_cells[tile]], self.length),
+                                    self.layout.tiles[direction]))
+
+    def _update_stone(self, y, x, color, change):
+        cell = y * self.shape[1] + x
+        self.empty[y,x] = change < 0
+        for direction in range(len(directions)):
+            row = self.layout.rows[direction][cell]
+            column = self.layout.columns[direction][cell]
+            # the windows that start up to ``length - 1`` positions before (y,x)
+            windows = slice(max(column - self.length + 1, 0), column + 1)
+            self.stones[color][direction][0][row, windows] += change
+            self.stones[-color][direction][1][row, windows] += change
+        self._live_lines = {}
+
+    def live_lines(self, color, minimum, maximum=None):
+        """
+        Return an integer array of the shape (4, height, width); the number
+        of windows through each position in each of the four
+        ``directions`` that hold no opposing stone and between `minimum`
+        and `maximum` stones of `color`.
+
+        """
+        if maximum is None:
+            maximum = self.length
+        key = (color, minimum, maximum)
+        if key in self._live_lines:
+            return self._live_lines[key]
+        counts = np.array([self._through_positions(color, direction,
+                                                   lambda own, opposing: (opposing == 0) & (own >= minimum) & (own <= maximum))
+                           for direction in range(len(directions))])
+        self._live_lines[key] = counts
+        return counts
+
+    def weighted_lines(self, color, weights):
+        """
+        Return an array of the board's shape; the sum of ``weights[n]``
+        over all windows through each position (in all four
+        ``directions``) that hold no opposing stone and ``n`` stones of
+        `color`.
+
+        :param weights:
+
+            sequence of ``length + 1`` numbers.
+
+        """
+        weights = np.asarray(weights)
+        return sum(self._through_positions(color, direction, lambda own, opposing: np.where(opposing == 0, weights[own], 0))
+                   for direction in range(len(directions)))
+
+    def _through_positions(self, color, direction, window_values):
+        """
+        Return an array of the board's shape; the sum of the values of the
+        windows in `direction` through each position. The values are
+        ``window_values(own, opposing)`` of the numbers of own and
+        opposing stones in the windows of `color` (as in ``stones``).
+
+        """
+        own, opposing = self.stones[color][direction]
+        line_cells = self.layout.cells[direction]
+        tiles = self.layout.tiles[direction]
+        def tile_sums(tile):
+            values = window_values(own[tile], opposing[tile])
+            # a position is covered by the windows starting up to
+            # ``length - 1`` positions before it
+            before = np.zeros((len(values), self.length - 1), dtype=values.dtype)
+            after = np.zeros((len(values), line_cells.shape[1] - values.shape[1]), dtype=values.dtype)
+            return window_sums(np.hstack((before, values, after)), self.length)
+        parts = map_tiles(tile_sums, tiles)
+        sums = np.zeros(self.shape[0] * self.shape[1] + 1, dtype=parts[0].dtype)
+        for tile, part in zip(tiles, parts):
+            sums[line_cells[tile]] = part
+        return sums[:-1].reshape(self.shape)
+
+    def crossings(self, color, minimum, maximum=None):
+        """
+        Return a boolean array of the board's shape; ``True`` at the empty
+        positions where live lines (see ``live_lines``) of at least two
+        different directions cross.
+
+        """
+        directions_with_lines = (self.live_lines(color, minimum, maximum) > 0).sum(axis=0)
+        return self.empty & (directions_with_lines >= 2)
@@ -0,0 +1,124 @@
+"""
+Implement a bounded transposition table for game-tree searches
+
+This module defines the bound types `exact`, `lower_bound` and
+`upper_bound` of the stored scores
+
+"""
+
+from collections import namedtuple
+import numpy as np
+
+# the bound types
+exact       = 0 # the score of the position
+lower_bound = 1 # the position scores at least the stored score (the search failed high)
+upper_bound = 2 # the position scores at most the stored score (the search failed low)
+
+# the result of a search stored in the table; ``move`` is the best move
+# ``(y,x)`` or None
+Entry = namedtuple('Entry', ['depth', 'bound', 'score', 'move'])
+
+class TranspositionTable(object):
+    """
+    Table of search results keyed by the 64-bit Zobrist ``hash`` of a
+    ``Board`` (see "board.py") that never grows beyond `memory` bytes.
+    Use one table per board shape.
+    The entries are preallocated in numpy arrays and grouped in buckets of
+    two; the bucket of a key is given by its lowest bits. The first entry
+    of a bucket is depth-preferred: it keeps the result of the deepest
+    search unless that stems from a search before the last call of
+    ``new_search``; a replaced first entry moves to the second entry.
+    Results that do not replace the first entry go to the second entry,
+    which is always replaced.
+    ``probes`` and ``hits`` count the calls of ``probe`` and how many of
+    them found the key; ``stores`` counts the calls of ``store``.
+
+    :param memory:
+
+        integer, optional; the maximum number of bytes of the table. The
+        number of buckets is the largest power of two that fits.
+
+    """
+    # the number of bytes of an entry: key, depth, bound, generation,
+    # score and the two coordinates of the move
+    entry_size = 8 + 1 + 1 + 1 + 8 + 2 * 2
+
+    def __init__(self, memory=2**24):
+        if memory < 2 * self.entry_size:
+            raise ValueError('A transposition table needs at least %i bytes' % (2 * self.entry_size))
+        number_of_buckets = 1
+        while 4 * number_of_buckets * self.entry_size <= memory:
+            number_of_buckets *= 2
+        self.mask = number_of_buckets - 1
+        shape = (number_of_buckets, 2)
+        self.keys = np.zeros(shape, dtype='uint64')
+        self.depths = np.zeros(shape, dtype='int8')
+        self.bounds = np.zeros(shape, dtype='int8')
+        self.generations = np.zeros(shape, dtype='uint8')
+        self.scores = np.zeros(shape, dtype='int64')
+        self.moves = np.zeros(shape + (2,), dtype='int16')
+        self.arrays = (self.keys, self.depths, self.bounds, self.generations, self.scores, self.moves)
+        self.clear()
+
+    def clear(self):
+        "Remove all entries and reset the counters"
+        self.depths[:] = -1 # marks an unused entry
+        self.moves[:] = -1
+        self.generation = 0
+        self.generations[:] = 0
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+
+    def __len__(self):
+        return int(np.count_nonzero(self.depths >= 0))
+
+    @property
+    def nbytes(self):
+        "The number of bytes of the arrays of the table"
+        return sum(array.nbytes for array in self.arrays)
+
+    def new_search(self):
+        "Mark all stored entries as old such that deeper results of earlier searches can be replaced"
+        self.generation = (self.generation + 1) % 256
+
+    def probe(self, key):
+        "Return the ``Entry`` stored for `key` or None"
+        self.probes += 1
+        bucket = key & self.mask
+        for slot in (0, 1):
+            if self.depths[bucket, slot] >= 0 and int(self.keys[bucket, slot]) == key:
+                self.hits += 1
+                y, x = self.moves[bucket, slot].tolist()
+                return Entry(int(self.depths[bucket, slot]), int(self.bounds[bucket, slot]),
+                             int(self.scores[bucket, slot]), None if y < 0 else (y, x))
+        return None
+
+    def store(self, key, depth, bound, score, move=None):
+        """
+        Store the result of a search of `depth` plies in the position with
+        the hash `key`: the `score` that is a `bound` (one of ``exact``,
+        ``lower_bound`` and ``upper_bound``) and the best `move` ``(y,x)``
+        found (optional).
+
+        """
+        self.stores += 1
+        bucket = key & self.mask
+        first_depth = self.depths[bucket, 0]
+        if first_depth < 0 or depth >= first_depth or int(self.keys[bucket, 0]) == key \
+                or self.generations[bucket, 0] != self.generation:
+            slot = 0
+            if first_depth >= 0 and int(self.keys[bucket, 0]) != key:
+                for array in self.arrays:
+                    array[bucket, 1] = array[bucket, 0]
+            elif int(self.keys[bucket, 1]) == key:
+                # drop the older result of the same position
+                self.depths[bucket, 1] = -1
+        else:
+            slot = 1
+        self.keys[bucket, slot] = key
+        self.depths[bucket, slot] = depth
+        self.bounds[bucket, slot] = bound
+        self.generations[bucket, slot] = self.generation
+        self.scores[bucket, slot] = score
+        self.moves[bucket, slot] = (-1, -1) if move is None else move
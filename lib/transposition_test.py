@@ -0,0 +1,61 @@
+"Unit test for the transposition table"
+
+import unittest
+from .board import Board, white, black
+from .transposition import *
+
+class TestTranspositionTable(unittest.TestCase):
+    def test_store_and_probe(self):
+        table = TranspositionTable()
+        board = Board(9, 9)
+        board[4,4] = white
+        self.assertTrue(table.probe(board.hash) is None)
+        table.store(board.hash, 3, exact, -1234, (3,5))
+        self.assertEqual(table.probe(board.hash), Entry(3, exact, -1234, (3,5)))
+        board[3,5] = black
+        table.store(board.hash, 2, lower_bound, 10 ** 12)
+        self.assertEqual(table.probe(board.hash), Entry(2, lower_bound, 10 ** 12, None))
+        board.undo()
+        self.assertEqual(table.probe(board.hash).move, (3,5))
+        self.assertEqual(len(table), 2)
+        self.assertEqual((table.probes, table.hits, table.stores), (4, 3, 2))
+        table.clear()
+        self.assertEqual(len(table), 0)
+        self.assertTrue(table.probe(board.hash) is None)
+
+    def test_memory(self):
+        for memory in (46, 1000, 2**20):
+            table = TranspositionTable(memory)
+            self.assertTrue(table.nbytes <= memory)
+            self.assertTrue(2 * table.nbytes > memory)
+        self.assertRaises(ValueError, TranspositionTable, 45)
+
+    def test_replacement(self):
+        table = TranspositionTable(2**10)
+        number_of_buckets = table.mask + 1
+        # keys of the same bucket
+        keys = [2**63 + 5, 5, 5 + number_of_buckets, 5 + 2 * number_of_buckets]
+        table.store(keys[0], 6, exact, 1)
+        table.store(keys[1], 2, exact, 2)
+        # the deeper result stays, the always-replace entry is overwritten
+        table.store(keys[2], 4, upper_bound, 3)
+        self.assertEqual(table.probe(keys[0]).score, 1)
+        self.assertTrue(table.probe(keys[1]) is None)
+        self.assertEqual(table.probe(keys[2]).score, 3)
+        # a deeper result replaces the depth-preferred entry, which moves
+        # to the always-replace entry
+        table.store(keys[3], 7, exact, 4)
+        self.assertEqual(table.probe(keys[3]).depth, 7)
+        self.assertEqual(table.probe(keys[0]).depth, 6)
+        self.assertTrue(table.probe(keys[2]) is None)
+        # an entry of an earlier search is replaced regardless of its depth
+        table.new_search()
+        table.store(keys[1], 1, exact, 5)
+        self.assertEqual(table.probe(keys[1]).score, 5)
+        self.assertEqual(table.probe(keys[3]).score, 4)
+        self.assertTrue(table.probe(keys[0]) is None)
+        # the same position is not stored twice
+        table.store(keys[3], 8, lower_bound, 6)
+        self.assertEqual(table.probe(keys[3]), Entry(8, lower_bound, 6, None))
+        self.assertEqual(table.probe(keys[1]).score, 5)
+        self.assertEqual(len(table), 2)